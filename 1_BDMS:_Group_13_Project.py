@@ -1,21 +1,7 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
-import warnings
-import plotly.express as px
-import gridstatus
-import datetime
-import time
-import psycopg2
+from electricity.app import page_setup
 
-warnings.filterwarnings('ignore')
-
-st.set_page_config(
-    #layout="wide",
-    page_title='Big Data Management Systems: Group 13 Project',
-    page_icon='👋',
-)
+page_setup(page_title='Big Data Management Systems: Group 13 Project', page_icon='👋')
 
 ### Web App by Streamlit
 
@@ -0,0 +1,259 @@
+"""Benchmarks for the query, aggregation and render hot paths.
+
+Generates synthetic 5-minute data (``benchmarks.synthetic``) for each ISO and history
+length, loads it into a SQLite stand-in or a scratch Postgres database, and times
+what the pages run:
+
+- ``sync_parquet``: mirroring closed months to the local Parquet copy
+- ``profile_stream`` / ``profile_sql`` / ``profile_rows``: building the sum/count profile
+  by streaming, in Postgres (Postgres only), or from materialized rows
+- ``read_range_cold`` / ``read_range_warm``: ``load_table_based_on_timerange`` (RangeCache
+  over the Parquet copy plus the database tail)
+- ``view_monthly`` / ``view_weekly`` / ``view_daily``: the three EDA aggregations
+- ``eda_chart`` / ``day_chart``: the chart builders behind ``plot_table_based_on_timerange``
+  and ``plot_day_data``
+- ``render_png`` / ``render_plotly`` (and ``*_day``): matplotlib PNG and plotly JSON rendering
+- ``render_pool``: ``RENDER_BATCH`` distinct PNGs through a render pool with one worker per core
+
+Each (ISO, years) dataset is generated and loaded in one subprocess and measured in
+another, so ``peak_rss_mb`` (the process high-water mark after each case) only covers
+the measured paths. Cases run from the least to the most memory-hungry.
+
+    python -m benchmarks.hot_paths                                   # SQLite, 1/5/20 years, every ISO
+    python -m benchmarks.hot_paths --years 1 --isos caiso -o bench.json
+    python -m benchmarks.hot_paths --database-url postgresql://localhost/scratch
+
+Postgres runs truncate and reload the ISO tables: only point it at a scratch database.
+"""
+import argparse
+import copy
+import datetime
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from electricity import parquet_store, schemas
+from electricity.isos import ISOS, split_table
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+YEARS = [1, 5, 20]
+
+RANGE_CACHE_BYTES = 8 * 1024 ** 3
+
+RENDER_BATCH = 16
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+class Recorder:
+    def __init__(self, **labels):
+        self.labels = labels
+        self.results = []
+
+    def time(self, case, rows, fn, **labels):
+        gc.collect()
+        started = time.perf_counter()
+        result = fn()
+        wall = time.perf_counter() - started
+        self.results.append({**self.labels, **labels, 'case': case, 'wall_s': round(wall, 6), 'rows': rows,
+                             'rows_per_s': round(rows / wall) if rows and wall > 0 else None,
+                             'peak_rss_mb': round(peak_rss_mb(), 1)})
+        return result
+
+
+def is_postgres(url):
+    return url.startswith('postgres')
+
+
+### Load phase
+
+def load_dataset(url, iso_key, years):
+    from benchmarks.synthetic import fuel_mix_frame, load_frame, timestamps
+    from electricity.rollups import ROLLUP_STATE_TABLE
+
+    engine = create_engine(url)
+    iso = ISOS[iso_key]
+    times = timestamps(years)
+    frames = {iso.load_table: lambda: load_frame(iso_key, times),
+              iso.fuel_mix_table: lambda: fuel_mix_frame(iso_key, times, seed=1)}
+
+    with engine.begin() as conn:
+        # no rollups: the profile has to come from the rows
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {ROLLUP_STATE_TABLE} (table_name text PRIMARY KEY, rolled_through date NOT NULL);"))
+        for table in frames:
+            conn.execute(text(f"DELETE FROM {ROLLUP_STATE_TABLE} WHERE table_name = :table;"), {'table': table})
+
+    if is_postgres(url):
+        from electricity.ingest import copy_upsert, normalize
+        from electricity.migrations import ensure_table, migrate
+
+        migrate(engine)
+        with engine.begin() as conn:
+            for table in frames:
+                ensure_table(conn, table, times[0].date(), times[-1].date() + datetime.timedelta(days=1))
+                conn.execute(text(f"TRUNCATE {table};"))
+        for table, frame in frames.items():
+            copy_upsert(engine, table, normalize(frame(), table))
+    else:
+        # the layout pandas.to_sql gave the original tables, plus an index on time
+        for table, frame in frames.items():
+            frame().to_sql(table, engine, index=False, if_exists='replace', chunksize=50_000)
+            with engine.begin() as conn:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {table}_time ON {schemas.checked_table(table)} (time);"))
+
+
+### Measure phase
+
+def synthetic_forecast(day_rows):
+    load = day_rows['load'].astype('float64')
+    return pd.DataFrame({'ds': day_rows['time'], 'yhat': load * 1.01, 'yhat_lower': load * 0.95, 'yhat_upper': load * 1.05})
+
+
+def chart_points(chart):
+    return sum(len(series['x']) * len(series.get('ys', [None])) for series in chart.series)
+
+
+def render_batch(pool, chart):
+    # RENDER_BATCH charts with the same data but distinct digests, rendered concurrently
+    charts = [copy.copy(chart) for _ in range(RENDER_BATCH)]
+    for i, variant in enumerate(charts):
+        variant.title = f'{chart.title} ({i})'
+    return [future.result() for future in [pool.submit(variant) for variant in charts]]
+
+
+def measure_table(rec, db, engine, table, postgres, pool):
+    from electricity.charts import render_matplotlib, render_plotly
+    from electricity.eda import average_chart
+    from electricity.figcache import figure_to_png
+    from electricity.profile import profile_from_frame, stream_profile, view_averages
+    from electricity.queries import PROFILE_KEYS, VIEWS, read_aggregate
+    from electricity.range_cache import RangeCache
+    from electricity.realtime import day_chart
+
+    columns = schemas.value_columns(table)
+    with engine.connect() as conn:
+        rows, first = conn.execute(text(f"SELECT count(*), min(time) FROM {schemas.checked_table(table)};")).one()
+    timemin = pd.Timestamp(first).date()
+    today = datetime.date.today()
+
+    rec.time('sync_parquet', rows, lambda: parquet_store.sync_table(engine, table), table=table)
+    rec.time('profile_stream', rows, lambda: stream_profile(db, table, timemin, today, columns), table=table)
+    if postgres:
+        rec.time('profile_sql', rows, lambda: read_aggregate(db, table, PROFILE_KEYS, timemin, today), table=table)
+
+    cache = RangeCache(lambda t, start, end: parquet_store.read_range(db, t, start, end, ttl=0), RANGE_CACHE_BYTES)
+    data = rec.time('read_range_cold', rows, lambda: cache.get(table, timemin, today), table=table)
+    rec.time('read_range_warm', rows, lambda: cache.get(table, timemin, today), table=table)
+    profile = rec.time('profile_rows', rows, lambda: profile_from_frame(data, columns), table=table)
+    del data, cache
+
+    for view in VIEWS:
+        averages = rec.time(f'view_{view}', len(profile), lambda: view_averages(profile, view), table=table)
+    chart = rec.time('eda_chart', len(profile), lambda: average_chart(table, 'daily', *averages), table=table)
+    rec.time('render_png', chart_points(chart), lambda: figure_to_png(render_matplotlib(chart)), table=table)
+    rec.time('render_plotly', chart_points(chart), lambda: render_plotly(chart).to_json(), table=table)
+    rec.time('render_pool', chart_points(chart) * RENDER_BATCH, lambda: render_batch(pool, chart), table=table)
+
+    yesterday = today - datetime.timedelta(days=1)
+    day_rows = db.query(f"SELECT {schemas.select_list(table)} FROM {schemas.checked_table(table)} WHERE time >= :start AND time < :end;",
+                        params={'start': yesterday, 'end': today}, ttl=0, **schemas.read_kwargs(table))
+    forecast = synthetic_forecast(db.query(f"SELECT time, load FROM {schemas.checked_table(split_table(table)[0].load_table)} WHERE time >= :start AND time < :end;",
+                                           params={'start': yesterday, 'end': today}, ttl=0, parse_dates=['time']))
+    chart = rec.time('day_chart', len(day_rows), lambda: day_chart(table, yesterday, day_rows, forecast), table=table)
+    rec.time('render_png_day', chart_points(chart), lambda: figure_to_png(render_matplotlib(chart)), table=table)
+    rec.time('render_plotly_day', chart_points(chart), lambda: render_plotly(chart).to_json(), table=table)
+
+
+def measure_dataset(url, iso_key, years, store_dir):
+    from electricity.db import Database
+    from electricity.render_pool import RenderPool
+
+    parquet_store.STORE_DIR = store_dir
+    engine = create_engine(url)
+    db = Database(engine)
+    rec = Recorder(iso=iso_key, years=years, backend='postgres' if is_postgres(url) else 'sqlite')
+    pool = RenderPool(os.cpu_count() or 1)
+    # start the pool before anything is timed
+    pool.pool.submit(int).result()
+    for table in ISOS[iso_key].tables:
+        measure_table(rec, db, engine, table, is_postgres(url), pool)
+    pool.pool.shutdown()
+    return rec.results
+
+
+### Runner
+
+def run_phase(phase, url, iso_key, years, store_dir):
+    command = [sys.executable, '-m', 'benchmarks.hot_paths', '--phase', phase, '--database-url', url,
+               '--isos', iso_key, '--years', str(years), '--store-dir', store_dir]
+    return subprocess.run(command, cwd=REPO_DIR, check=True, stdout=subprocess.PIPE, text=True).stdout
+
+
+def run(url, isos, years_list, workdir):
+    results = []
+    for years in years_list:
+        for iso_key in isos:
+            dataset_url = url or f"sqlite:///{os.path.join(workdir, f'{iso_key}_{years}y.db')}"
+            store_dir = os.path.join(workdir, f'parquet_{iso_key}_{years}y')
+            print(f'{iso_key}, {years} years: loading', file=sys.stderr)
+            run_phase('load', dataset_url, iso_key, years, store_dir)
+            print(f'{iso_key}, {years} years: measuring', file=sys.stderr)
+            results += json.loads(run_phase('measure', dataset_url, iso_key, years, store_dir))
+    return results
+
+
+def meta(url):
+    import matplotlib
+    import numpy as np
+
+    return {
+        'started': datetime.datetime.now().isoformat(timespec='seconds'),
+        'backend': 'postgres' if url and is_postgres(url) else 'sqlite',
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='scratch Postgres database; default: one SQLite file per dataset')
+    parser.add_argument('--isos', nargs='+', default=list(ISOS), choices=list(ISOS))
+    parser.add_argument('--years', nargs='+', type=int, default=YEARS)
+    parser.add_argument('--workdir', help='where SQLite files and Parquet copies go; default: a temporary directory')
+    parser.add_argument('-o', '--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--phase', choices=['load', 'measure'], help=argparse.SUPPRESS)
+    parser.add_argument('--store-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase == 'load':
+        load_dataset(args.database_url, args.isos[0], args.years[0])
+    elif args.phase == 'measure':
+        json.dump(measure_dataset(args.database_url, args.isos[0], args.years[0], args.store_dir), sys.stdout)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = args.workdir or tmp
+            os.makedirs(workdir, exist_ok=True)
+            report = {'meta': meta(args.database_url), 'results': run(args.database_url, args.isos, args.years, workdir)}
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+        else:
+            json.dump(report, sys.stdout, indent=2)
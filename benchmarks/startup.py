@@ -0,0 +1,91 @@
+"""Import-time budget for the page scripts.
+
+Streamlit re-executes a page script on every interaction and imports its modules on
+the first run, so whatever a page imports at top level is paid at server start and
+first render. For each script this runs its top-level imports (nothing else) in a
+fresh interpreter, ``--repeat`` times, and reports the median. Streamlit itself is
+imported before the clock starts, as the server has already loaded it when a page
+runs. The check fails when a page goes over its budget or loads a module that should
+only be imported on first use.
+
+    python -m benchmarks.startup                 # report and check, exit status 1 on failure
+    python -m benchmarks.startup --repeat 9 -o startup.json
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Milliseconds of imports a page may add on top of Streamlit
+BUDGET_MS = {
+    '1_BDMS:_Group_13_Project.py': 50,
+    'pages/2_🔌_Realtime_Electricity_Data_Dashboard.py': 1500,
+    'pages/3_📈_Exploratory_Data_Analysis.py': 1500,
+}
+
+# Only ever imported inside the functions that need them
+LAZY_MODULES = ['matplotlib', 'plotly', 'gridstatus', 'psycopg2']
+
+FRAMEWORK_MODULES = ['streamlit']
+
+MEASURE = """
+import importlib, json, sys, time
+for name in {framework!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+started = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'ms': elapsed * 1000, 'loaded': [name for name in {lazy!r} if name in sys.modules]}}))
+"""
+
+
+def page_imports(path):
+    # The script's top-level import statements as source, framework imports left out
+    with open(os.path.join(REPO_DIR, path), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    statements = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias for alias in node.names if alias.name.split('.')[0] not in FRAMEWORK_MODULES]
+            if names:
+                statements.append(ast.unparse(ast.Import(names=names)))
+        elif isinstance(node, ast.ImportFrom) and (node.module or '').split('.')[0] not in FRAMEWORK_MODULES:
+            statements.append(ast.unparse(node))
+    return '\n'.join(statements) or 'pass'
+
+
+def measure(path, repeat):
+    code = MEASURE.format(framework=FRAMEWORK_MODULES, imports=page_imports(path), lazy=LAZY_MODULES)
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR, check=True, stdout=subprocess.PIPE, text=True).stdout
+        runs.append(json.loads(out))
+    ms = statistics.median(run['ms'] for run in runs)
+    loaded = sorted({name for run in runs for name in run['loaded']})
+    budget = BUDGET_MS[path]
+    return {'page': path, 'import_ms': round(ms, 1), 'budget_ms': budget, 'lazy_modules_loaded': loaded,
+            'ok': ms <= budget and not loaded}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('-o', '--output', help='write the JSON results here as well')
+    args = parser.parse_args()
+
+    results = [measure(path, args.repeat) for path in BUDGET_MS]
+    for res in results:
+        extra = f", loads {', '.join(res['lazy_modules_loaded'])}" if res['lazy_modules_loaded'] else ''
+        print(f"{'ok  ' if res['ok'] else 'FAIL'} {res['page']}: {res['import_ms']} ms of {res['budget_ms']} ms{extra}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if all(res['ok'] for res in results) else 1)
@@ -0,0 +1,63 @@
+"""Synthetic 5-minute ISO data shaped like the gridstatus frames the app loads.
+
+Load follows a daily and a yearly cycle plus noise. Fuel mix splits a similar curve
+over the ISO's fuel sources, with solar only in daylight. CAISO frames carry the
+``interval_start`` / ``interval_end`` columns gridstatus returns, and every frame
+has the ``index`` column that ``DataFrame.to_sql`` used to write.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from electricity.isos import ISOS
+
+FREQ = '5min'
+
+# Typical load level per ISO in MW
+BASE_LOAD = {'nyiso': 18_000, 'caiso': 26_000, 'isone': 13_000}
+
+
+def timestamps(years, end=None):
+    end = pd.Timestamp(end or datetime.date.today())
+    return pd.date_range(end - pd.DateOffset(years=years), end, freq=FREQ, inclusive='left')
+
+
+def _cycles(times):
+    hours = times.hour.to_numpy() + times.minute.to_numpy() / 60
+    days = times.dayofyear.to_numpy()
+    daily = np.sin((hours - 9) / 24 * 2 * np.pi)
+    yearly = np.cos((days - 200) / 365.25 * 2 * np.pi)
+    return hours, daily, yearly
+
+
+def _with_extras(frame, iso_key):
+    if iso_key == 'caiso':
+        frame['interval_start'] = frame['time']
+        frame['interval_end'] = frame['time'] + pd.Timedelta(FREQ)
+    frame.insert(0, 'index', np.arange(len(frame)))
+    return frame
+
+
+def load_frame(iso_key, times, seed=0):
+    rng = np.random.default_rng(seed)
+    _, daily, yearly = _cycles(times)
+    base = BASE_LOAD.get(iso_key, 15_000)
+    load = base * (1 + 0.15 * daily + 0.1 * yearly) + rng.normal(0, base * 0.02, len(times))
+    return _with_extras(pd.DataFrame({'time': times, 'load': load.astype('float32')}), iso_key)
+
+
+def fuel_mix_frame(iso_key, times, seed=0):
+    rng = np.random.default_rng(seed)
+    hours, daily, yearly = _cycles(times)
+    sources = ISOS[iso_key].fuel_sources
+    shares = rng.dirichlet(np.ones(len(sources)))
+    total = BASE_LOAD.get(iso_key, 15_000) * (1 + 0.15 * daily + 0.1 * yearly)
+    daylight = np.clip(np.sin((hours - 6) / 12 * np.pi), 0, None)
+    columns = {}
+    for source, share in zip(sources, shares):
+        values = total * share * rng.normal(1, 0.05, len(times))
+        if source == 'solar':
+            values = values * daylight * 2
+        columns[source] = values.astype('float32')
+    return _with_extras(pd.DataFrame({'time': times, **columns}), iso_key)
@@ -0,0 +1 @@
+"""Shared data helpers for the Group 13 electricity Streamlit app."""
@@ -0,0 +1,341 @@
+"""Read-only HTTP API for the numbers the pages show, without the render path.
+
+    GET /v1/isos                                   registry: ISOs and their tables
+    GET /v1/intraday/<table>[?after=<timestamp>]   current operating day (get_day_data)
+    GET /v1/forecast/<iso>[?day=YYYY-MM-DD]        day-of load forecast (get_dayof_forecast)
+    GET /v1/series/<table>?start=...&end=...       raw rows, at most MAX_SERIES_DAYS
+    GET /v1/aggregates/<table>/<view>[?start=...&end=...]
+                                                   monthly / weekly / daily averages, one row
+                                                   per (year, month|weekday|hour) plus
+                                                   year = null rows for the overall average
+    GET /metrics                                   tracing totals, Prometheus text format
+
+Responses are JSON records, or an Arrow IPC stream with ``?format=arrow`` or
+``Accept: application/vnd.apache.arrow.stream``. Every response has a weak ETag
+(``If-None-Match`` gets a 304). Series responses also have Last-Modified, the time
+of their newest row. Bodies over ``GZIP_MIN_BYTES`` are gzipped for clients that
+accept it.
+
+The data comes through the same code as the pages: the pooled ``Database`` and
+its query cache, ``IntradayCache``, a ``RangeCache`` over the Parquet copy, and
+``load_profile`` with its rollup / Parquet / Postgres tiers. The API is its own
+process, so these caches are its own too; nothing is shared with a running app.
+Finished aggregate responses are kept for ``AGGREGATE_TTL`` seconds, like the EDA
+page's profile cache.
+
+    python -m electricity.api [--host 0.0.0.0] [--port 8600]
+"""
+import argparse
+import datetime
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from electricity import parquet_store, schemas
+from electricity.db import database
+from electricity.intraday import IntradayCache
+from electricity.isos import ISOS, split_table
+from electricity.profile import load_profile, view_averages
+from electricity.queries import VIEWS
+from electricity.range_cache import RangeCache
+from electricity.tracing import prometheus_text, span
+
+logger = logging.getLogger(__name__)
+
+MAX_SERIES_DAYS = 31
+
+AGGREGATE_TTL = 10 * 60
+
+RESPONSE_CACHE_ENTRIES = 256
+
+GZIP_MIN_BYTES = 1024
+
+RANGE_CACHE_BYTES = 512 * 1024 * 1024
+
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+JSON_TYPE = 'application/json'
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+### Shared caches
+
+_intraday = {}
+_range_cache = None
+_responses = {}
+_lock = threading.Lock()
+
+
+def intraday_cache(table):
+    with _lock:
+        if table not in _intraday:
+            _intraday[table] = IntradayCache(table)
+        return _intraday[table]
+
+
+def range_cache():
+    # Same loader as the EDA page: closed months from Parquet, the rest from Postgres
+    global _range_cache
+    with _lock:
+        if _range_cache is None:
+            conn = database()
+            _range_cache = RangeCache(lambda table, start, end: parquet_store.read_range(conn, table, start, end, ttl=0),
+                                      max_bytes=RANGE_CACHE_BYTES)
+        return _range_cache
+
+
+def cached_response(key, ttl, build):
+    # build() -> (body, content type, last modified); kept for ttl seconds
+    now = time.monotonic()
+    with _lock:
+        expires, response = _responses.get(key, (0, None))
+    if expires > now:
+        return response
+    response = build()
+    with _lock:
+        _responses.pop(key, None)
+        while len(_responses) >= RESPONSE_CACHE_ENTRIES:
+            del _responses[next(iter(_responses))]
+        _responses[key] = (now + ttl, response)
+    return response
+
+
+### Parameters
+
+def data_table(table):
+    if table not in schemas.DATA_TABLES:
+        raise ApiError(404, f'Unknown table: {table}')
+    return table
+
+
+def date_param(params, name, default=None):
+    if name not in params:
+        return default
+    try:
+        return datetime.date.fromisoformat(params[name])
+    except ValueError:
+        raise ApiError(400, f'{name} must be a date (YYYY-MM-DD)')
+
+
+def timestamp_param(params, name):
+    if name not in params:
+        return None
+    try:
+        return pd.Timestamp(params[name])
+    except ValueError:
+        raise ApiError(400, f'{name} must be an ISO 8601 timestamp')
+
+
+### Encoding
+
+def encode(frame, fmt):
+    if fmt == 'arrow':
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes(), ARROW_TYPE
+    return frame.to_json(orient='records', date_format='iso').encode(), JSON_TYPE
+
+
+def same_zone(timestamp, times):
+    # timestamp made comparable with the (possibly tz-aware) times
+    tz = times.dt.tz
+    if timestamp.tzinfo is None:
+        return timestamp if tz is None else timestamp.tz_localize(tz)
+    return timestamp.tz_convert(tz) if tz is not None else timestamp.tz_convert('UTC').tz_localize(None)
+
+
+def newest(frame, column):
+    # Last-Modified of a series: its newest row
+    if frame.empty:
+        return None
+    latest = pd.Timestamp(frame[column].max())
+    return (latest.tz_convert('UTC') if latest.tzinfo else latest.tz_localize('UTC')).to_pydatetime()
+
+
+def aggregate_frame(per_year, overall, view):
+    # Long format: one row per (year, view key), overall averages with year = null
+    key = VIEWS[view]
+    per_year = per_year.stack(level=1, future_stack=True).rename_axis([key, 'year']).reset_index()
+    overall = overall.rename_axis(key).reset_index().assign(year=pd.NA)
+    frame = pd.concat([per_year, overall], ignore_index=True).astype({'year': 'Int64'})
+    return frame[['year', key] + [column for column in frame.columns if column not in ('year', key)]]
+
+
+### Endpoints
+
+def isos_response(params, fmt):
+    body = json.dumps([{'key': iso.key, 'label': iso.label, 'region': iso.region, 'tables': iso.tables,
+                        'forecast_table': iso.forecast_table, 'fuel_sources': iso.fuel_sources,
+                        'history': {kind: [str(first), str(start)] for kind, (first, start) in iso.history.items()}}
+                       for iso in ISOS.values()])
+    return body.encode(), JSON_TYPE, None
+
+
+def intraday_response(params, fmt, table):
+    day, rows = intraday_cache(data_table(table)).get(database())
+    after = timestamp_param(params, 'after')
+    if after is not None and not rows.empty:
+        rows = rows[rows['time'] > same_zone(after, rows['time'])]
+    body, content_type = encode(rows, fmt)
+    return body, content_type, newest(rows, 'time')
+
+
+def forecast_response(params, fmt, iso_key):
+    if iso_key not in ISOS:
+        raise ApiError(404, f'Unknown ISO: {iso_key}')
+    table = ISOS[iso_key].forecast_table
+    day = date_param(params, 'day', datetime.date.today())
+    res = database().query(f"SELECT {schemas.select_list(table)} FROM {schemas.checked_table(table)} WHERE ds >= :start AND ds < :end;",
+                           params={'start': day, 'end': day + datetime.timedelta(days=1)}, ttl=60, prepare=True,
+                           **schemas.read_kwargs(table))
+    body, content_type = encode(res, fmt)
+    return body, content_type, newest(res, 'ds')
+
+
+def series_response(params, fmt, table):
+    table = data_table(table)
+    start = date_param(params, 'start')
+    end = date_param(params, 'end', datetime.date.today() + datetime.timedelta(days=1))
+    if start is None or not start < end:
+        raise ApiError(400, 'start (YYYY-MM-DD) is required and must be before end')
+    if (end - start).days > MAX_SERIES_DAYS:
+        raise ApiError(400, f'at most {MAX_SERIES_DAYS} days per request; use /v1/aggregates for longer ranges')
+    rows = range_cache().get(table, start, end)
+    body, content_type = encode(rows, fmt)
+    return body, content_type, newest(rows, 'time')
+
+
+def aggregates_response(params, fmt, table, view):
+    table = data_table(table)
+    if view not in VIEWS:
+        raise ApiError(404, f"Unknown view: {view} (one of {', '.join(VIEWS)})")
+    iso, kind = split_table(table)
+    start = date_param(params, 'start', iso.history[kind][1])
+    end = date_param(params, 'end', datetime.date.today())
+    if not start < end:
+        raise ApiError(400, 'start (YYYY-MM-DD) must be before end')
+
+    def build():
+        profile = load_profile(database(), table, start, end, read_rows=range_cache().get)
+        body, content_type = encode(aggregate_frame(*view_averages(profile, view), view), fmt)
+        return body, content_type, None
+
+    return cached_response((table, view, start, end, fmt), AGGREGATE_TTL, build)
+
+
+# /v1/<name>/... -> (handler, number of path arguments after the name)
+ROUTES = {
+    'isos': (isos_response, 0),
+    'intraday': (intraday_response, 1),
+    'forecast': (forecast_response, 1),
+    'series': (series_response, 1),
+    'aggregates': (aggregates_response, 2),
+}
+
+
+### Server
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = 'electricity-api'
+
+    def _format(self, params):
+        if params.get('format') == 'arrow' or ARROW_TYPE in self.headers.get('Accept', ''):
+            return 'arrow'
+        return 'json'
+
+    def _route(self, parts, params):
+        if parts == ['metrics']:
+            return prometheus_text().encode(), 'text/plain; version=0.0.4', None
+        if len(parts) >= 2 and parts[0] == 'v1' and parts[1] in ROUTES:
+            handler, arguments = ROUTES[parts[1]]
+            if len(parts) == 2 + arguments:
+                return handler(params, self._format(params), *parts[2:])
+        raise ApiError(404, f'Not found: /{"/".join(parts)}')
+
+    def _not_modified(self, etag, last_modified):
+        if 'If-None-Match' in self.headers:
+            return etag in [tag.strip() for tag in self.headers['If-None-Match'].split(',')] or self.headers['If-None-Match'] == '*'
+        if last_modified is not None and 'If-Modified-Since' in self.headers:
+            try:
+                return last_modified.replace(microsecond=0) <= parsedate_to_datetime(self.headers['If-Modified-Since'])
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send(self, status, body, content_type, headers=()):
+        if len(body) >= GZIP_MIN_BYTES and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=5)
+            headers = [*headers, ('Content-Encoding', 'gzip')]
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept, Accept-Encoding')
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        with span('api.request', path=url.path) as trace:
+            try:
+                body, content_type, last_modified = self._route(parts, params)
+            except ApiError as e:
+                trace['status'] = e.status
+                self._send(e.status, json.dumps({'error': str(e)}).encode(), JSON_TYPE)
+                return
+            except Exception:
+                logger.exception('%s failed', self.path)
+                trace['status'] = 500
+                self._send(500, json.dumps({'error': 'internal error'}).encode(), JSON_TYPE)
+                return
+            etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+            headers = [('ETag', etag), ('Cache-Control', 'no-cache')]
+            if last_modified is not None:
+                headers.append(('Last-Modified', format_datetime(last_modified, usegmt=True)))
+            if self._not_modified(etag, last_modified):
+                trace.update(status=304, cache='hit')
+                self.send_response(304)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                return
+            trace.update(status=200, bytes=len(body))
+            self._send(200, body, content_type, headers)
+
+    do_HEAD = do_GET
+
+
+def serve(host='0.0.0.0', port=8600):
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8600)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    serve(args.host, args.port)
@@ -0,0 +1,17 @@
+"""Setup shared by the landing page and both pages.
+
+Per-ISO settings (labels, regions, fuel sources, tables) come from the registry in
+``electricity.isos``; nothing is repeated in the page scripts. Streamlit re-executes
+a page script on every interaction, so the scripts only import what they use at top
+level. Heavy or optional libraries (matplotlib, plotly, gridstatus, pyarrow, the
+Postgres driver) are imported inside the functions that need them, on first use.
+``python -m benchmarks.startup`` checks the import cost of each page against a budget.
+"""
+import warnings
+
+
+def page_setup(page_title, page_icon, layout='centered'):
+    import streamlit as st
+
+    warnings.filterwarnings('ignore')
+    st.set_page_config(layout=layout, page_title=page_title, page_icon=page_icon)
@@ -0,0 +1,270 @@
+"""Backend-neutral chart specs for both pages.
+
+Plot functions describe a chart (series arrays plus titles, ticks and limits) as a
+``Chart`` and ``show_chart`` hands it to the configured backend:
+
+- ``plotly`` (default): the series are sent to the browser and drawn client-side.
+- ``matplotlib``: rasterized on the server with the object-oriented Figure API,
+  so nothing is left behind in pyplot's global figure manager. Rendering happens in
+  the worker processes of ``electricity.render_pool``. The PNG (or, with
+  ``CHART_IMAGE_FORMAT=svg``, SVG) bytes are kept in the bounded ``FIGURE_CACHE``,
+  not the Figure.
+
+Long line and area series are reduced with LTTB to ``POINT_BUDGET`` points before
+they are stored, so the payload no longer grows with the number of rows. Families of
+series (one line per year, one bar layer per fuel source) are stored as one matrix
+and drawn in a single call.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+from electricity.figcache import FIGURE_CACHE, figure_to_bytes
+from electricity.lttb import lttb_indices
+from electricity.render_pool import render_pool
+from electricity.tracing import span
+
+CHART_BACKEND = os.environ.get('CHART_BACKEND', 'plotly')
+
+# Image format of server-rendered charts: 'png' or 'svg'
+CHART_IMAGE_FORMAT = os.environ.get('CHART_IMAGE_FORMAT', 'png')
+
+POINT_BUDGET = 1000
+
+MONTH_TICKS = (list(range(1, 13)), ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
+WEEKDAY_TICKS = (list(range(0, 7)), ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
+HOUR_TICKS = (list(range(0, 24)), [f'{i}:00' for i in range(0, 24)])
+
+
+class Chart:
+    def __init__(self, title, xlabel, ylabel, xticks=None, xlim=None, ylim_bottom=None,
+                 legend_title=None, time_axis=False, figsize=(14, 8)):
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.xticks = xticks
+        self.xlim = xlim
+        self.ylim_bottom = ylim_bottom
+        self.legend_title = legend_title
+        # x values are timestamps, labelled hourly as HH:MM
+        self.time_axis = time_axis
+        self.figsize = figsize
+        self.series = []
+
+    def line(self, x, y, label=None, color=None, linewidth=None, alpha=None, dashed=False, max_points=POINT_BUDGET):
+        keep = lttb_indices(x, y, max_points)
+        self.series.append({'kind': 'line', 'x': np.asarray(x)[keep], 'y': np.asarray(y)[keep], 'label': label,
+                            'color': color, 'linewidth': linewidth, 'alpha': alpha, 'dashed': dashed})
+        return self
+
+    def lines(self, x, ys, labels, alpha=None):
+        # ys: one row per label, all on the same (short) x; drawn in one call
+        self.series.append({'kind': 'lines', 'x': np.asarray(x), 'ys': np.asarray(ys, dtype=float),
+                            'labels': list(labels), 'alpha': alpha})
+        return self
+
+    def band(self, x, lower, upper, color=None, alpha=0.2):
+        self.series.append({'kind': 'band', 'x': np.asarray(x), 'lower': np.asarray(lower),
+                            'upper': np.asarray(upper), 'color': color, 'alpha': alpha})
+        return self
+
+    def stacked_area(self, x, ys, labels, max_points=POINT_BUDGET):
+        # ys: one row per label; downsampled on the stack total so all layers keep the same x
+        ys = np.asarray(ys, dtype=float)
+        keep = lttb_indices(x, ys.sum(axis=0), max_points)
+        self.series.append({'kind': 'stacked_area', 'x': np.asarray(x)[keep], 'ys': ys[:, keep], 'labels': list(labels)})
+        return self
+
+    def stacked_bars(self, x, ys, labels, colors, alpha=0.7):
+        # ys: one row per label, stacked bottom to top
+        self.series.append({'kind': 'stacked_bars', 'x': np.asarray(x), 'ys': np.asarray(ys, dtype=float),
+                            'labels': list(labels), 'colors': list(colors), 'alpha': alpha})
+        return self
+
+    def digest(self):
+        # Content hash: identical charts share one rendered image
+        h = hashlib.sha1(repr((self.title, self.xlabel, self.ylabel, self.xticks, self.xlim, self.ylim_bottom,
+                               self.legend_title, self.time_axis, self.figsize)).encode())
+        for series in self.series:
+            for name, value in sorted(series.items()):
+                h.update(name.encode())
+                if isinstance(value, np.ndarray) and value.dtype != object:
+                    h.update(value.tobytes())
+                else:
+                    h.update(repr(value).encode())
+        return h.hexdigest()
+
+
+class ChartSet:
+    # Named charts that declare their inputs: get() only calls the builder again when the
+    # inputs differ from the ones the current chart was built from
+    def __init__(self):
+        self.inputs = {}
+        self.charts = {}
+        self.builds = 0
+
+    def get(self, name, inputs, build):
+        if name not in self.charts or self.inputs[name] != inputs:
+            self.charts[name] = build(*inputs)
+            self.inputs[name] = inputs
+            self.builds += 1
+        return self.charts[name]
+
+
+### matplotlib backend
+
+def render_matplotlib(chart):
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Patch
+    import matplotlib.dates as mdates
+
+    fig = Figure(figsize=chart.figsize)
+    ax = fig.subplots()
+    # bars drawn in one call have no per-layer legend entries of their own
+    legend_patches = []
+
+    for series in chart.series:
+        if series['kind'] == 'line':
+            ax.plot(series['x'], series['y'], '--' if series['dashed'] else '-', label=series['label'],
+                    color=series['color'], linewidth=series['linewidth'], alpha=series['alpha'])
+        elif series['kind'] == 'lines':
+            for line, label in zip(ax.plot(series['x'], series['ys'].T, alpha=series['alpha']), series['labels']):
+                line.set_label(label)
+        elif series['kind'] == 'band':
+            ax.fill_between(series['x'], series['lower'], series['upper'], color=series['color'], alpha=series['alpha'])
+        elif series['kind'] == 'stacked_area':
+            ax.stackplot(series['x'], series['ys'], labels=series['labels'])
+        elif series['kind'] == 'stacked_bars':
+            ys = series['ys']
+            layers, width = ys.shape
+            bottoms = np.vstack([np.zeros(width), np.cumsum(ys, axis=0)[:-1]])
+            colors = [color for color in series['colors'] for _ in range(width)]
+            ax.bar(np.tile(series['x'], layers), ys.ravel(), bottom=bottoms.ravel(), color=colors, alpha=series['alpha'])
+            legend_patches += [Patch(facecolor=color, alpha=series['alpha'], label=label)
+                               for label, color in zip(series['labels'], series['colors'])]
+
+    if chart.time_axis:
+        ax.xaxis.set_major_locator(mdates.HourLocator(interval=1))
+        ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
+    if chart.xticks is not None:
+        ax.set_xticks(*chart.xticks)
+    if chart.xlim is not None:
+        ax.set_xlim(*chart.xlim)
+    if chart.ylim_bottom is not None:
+        ax.set_ylim(bottom=chart.ylim_bottom)
+
+    ax.set_title(chart.title, fontsize=16)
+    ax.set_xlabel(chart.xlabel, fontsize=12)
+    ax.set_ylabel(chart.ylabel, fontsize=12)
+    ax.grid(True)
+    handles, _ = ax.get_legend_handles_labels()
+    ax.legend(handles=handles + legend_patches, title=chart.legend_title, bbox_to_anchor=(1.05, 1), loc='upper right')
+    fig.tight_layout()
+    return fig
+
+
+### plotly backend
+
+def _plotly_color(color, alpha=None):
+    if color is None:
+        return None
+    from matplotlib.colors import to_rgba
+
+    r, g, b, a = to_rgba(color)
+    return f'rgba({int(r * 255)}, {int(g * 255)}, {int(b * 255)}, {a if alpha is None else alpha})'
+
+
+def render_plotly(chart):
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    for series in chart.series:
+        if series['kind'] == 'line':
+            fig.add_trace(go.Scatter(x=series['x'], y=series['y'], mode='lines', name=series['label'],
+                                     opacity=series['alpha'], showlegend=series['label'] is not None,
+                                     line={'color': _plotly_color(series['color']), 'width': series['linewidth'],
+                                           'dash': 'dash' if series['dashed'] else None}))
+        elif series['kind'] == 'lines':
+            for y, label in zip(series['ys'], series['labels']):
+                fig.add_trace(go.Scatter(x=series['x'], y=y, mode='lines', name=label, opacity=series['alpha']))
+        elif series['kind'] == 'band':
+            fig.add_trace(go.Scatter(x=series['x'], y=series['lower'], mode='lines', line={'width': 0},
+                                     showlegend=False, hoverinfo='skip'))
+            fig.add_trace(go.Scatter(x=series['x'], y=series['upper'], mode='lines', line={'width': 0},
+                                     fill='tonexty', fillcolor=_plotly_color(series['color'] or 'tab:orange', series['alpha']),
+                                     showlegend=False, hoverinfo='skip'))
+        elif series['kind'] == 'stacked_area':
+            for y, label in zip(series['ys'], series['labels']):
+                fig.add_trace(go.Scatter(x=series['x'], y=y, mode='lines', name=label, stackgroup='stack',
+                                         line={'width': 0}))
+        elif series['kind'] == 'stacked_bars':
+            for y, label, color in zip(series['ys'], series['labels'], series['colors']):
+                fig.add_trace(go.Bar(x=series['x'], y=y, name=label, marker_color=_plotly_color(color, series['alpha'])))
+            fig.update_layout(barmode='stack', bargap=0.2)
+
+    xaxis = {'title': chart.xlabel, 'showgrid': True}
+    if chart.time_axis:
+        xaxis.update(tickformat='%H:%M', dtick=60 * 60 * 1000)
+    if chart.xticks is not None:
+        xaxis.update(tickvals=chart.xticks[0], ticktext=chart.xticks[1])
+    if chart.xlim is not None:
+        xaxis.update(range=list(chart.xlim))
+    yaxis = {'title': chart.ylabel, 'showgrid': True}
+    if chart.ylim_bottom == 0:
+        yaxis.update(rangemode='tozero')
+
+    width, height = chart.figsize
+    fig.update_layout(title=chart.title, xaxis=xaxis, yaxis=yaxis, legend_title_text=chart.legend_title,
+                      height=int(height * 60))
+    return fig
+
+
+def render_image(chart, fmt=None):
+    # -> PNG or SVG bytes, from the render pool when there is one
+    fmt = fmt or CHART_IMAGE_FORMAT
+    pool = render_pool()
+    if pool is not None:
+        with span('render.pool', title=chart.title, format=fmt) as trace:
+            image = pool.render(chart, fmt)
+            trace['bytes'] = len(image)
+        return image
+    with span('render.matplotlib', title=chart.title):
+        fig = render_matplotlib(chart)
+    with span(f'render.{fmt}', title=chart.title) as trace:
+        image = figure_to_bytes(fig, fmt)
+        trace['bytes'] = len(image)
+    return image
+
+
+def image_key(chart, fmt=None):
+    return f'{chart.digest()}.{fmt or CHART_IMAGE_FORMAT}'
+
+
+def prerender(chart, backend=None):
+    # Server-side work show_chart would do, done ahead of time (only matplotlib has any)
+    backend = backend or CHART_BACKEND
+    if backend == 'matplotlib':
+        FIGURE_CACHE.get_or_render(image_key(chart), lambda: render_image(chart))
+
+
+def show_chart(container, chart, backend=None):
+    # container: any Streamlit container or placeholder
+    backend = backend or CHART_BACKEND
+    with span('chart.show', title=chart.title, backend=backend) as trace:
+        if backend == 'plotly':
+            with span('render.plotly', title=chart.title):
+                fig = render_plotly(chart)
+            container.plotly_chart(fig, use_container_width=True)
+        elif backend == 'matplotlib':
+            key = image_key(chart)
+            image = FIGURE_CACHE.get(key)
+            trace['cache'] = 'miss' if image is None else 'hit'
+            if image is None:
+                image = render_image(chart)
+                FIGURE_CACHE.put(key, image)
+            trace['bytes'] = len(image)
+            # st.image takes SVG as markup, not bytes
+            container.image(image.decode() if CHART_IMAGE_FORMAT == 'svg' else image, use_container_width=True)
+        else:
+            raise ValueError(f'Unknown chart backend: {backend}')
@@ -0,0 +1,217 @@
+"""Database access: engine, sized connection pool, prepared statements and metrics.
+
+``get_engine()`` is for code that runs outside of a Streamlit session (CLIs, jobs).
+The pages share one ``Database`` per server process (``database()``). It has a
+fixed-size pool and a ``query()`` that can be called like ``st.connection(...).query``.
+``stream()`` reads large results in chunks through a server-side cursor.
+``query(..., prepare=True)`` runs the statement as a server-side prepared statement,
+which each pooled connection prepares once and then re-executes. Time spent waiting
+for a pooled connection and per-statement latency are kept in ``stats()``.
+"""
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tomllib
+from contextlib import contextmanager
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL
+
+from electricity.tracing import frame_bytes, span
+
+logger = logging.getLogger(__name__)
+
+SECRETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.streamlit', 'secrets.toml')
+
+# Connections per server process: POOL_SIZE kept open, never more than POOL_SIZE + MAX_OVERFLOW
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 0))
+POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+
+# Cached query results per Database
+QUERY_CACHE_ENTRIES = 256
+
+# :name bind parameters, but not ::type casts
+BIND_PARAM = re.compile(r'(?<![:\w]):(\w+)')
+
+
+def connection_secrets():
+    # Inside a running Streamlit app st.secrets, so every secrets location Streamlit knows
+    # (global, project, hosted) applies; CLIs and jobs read the repo's secrets.toml.
+    if 'streamlit' in sys.modules:
+        import streamlit as st
+        from streamlit import runtime
+
+        if runtime.exists():
+            return st.secrets['connections']['postgresql']
+    with open(SECRETS_PATH, 'rb') as f:
+        return tomllib.load(f)['connections']['postgresql']
+
+
+def database_url():
+    # Same credentials as st.connection("postgresql", type="sql"): DATABASE_URL wins,
+    # otherwise the [connections.postgresql] secrets.
+    url = os.environ.get('DATABASE_URL')
+    if url is None:
+        secrets = connection_secrets()
+        url = secrets.get('url') or URL.create(
+            drivername=secrets.get('dialect', 'postgresql') + '+' + secrets.get('driver', 'psycopg2'),
+            username=secrets.get('username'),
+            password=secrets.get('password'),
+            host=secrets.get('host'),
+            port=secrets.get('port'),
+            database=secrets.get('database'),
+        )
+    return url
+
+
+def get_engine(**kwargs):
+    return create_engine(database_url(), **kwargs)
+
+
+def ttl_seconds(ttl):
+    # st.connection ttl semantics: None caches forever, 0 not at all, "10m" / "1d" / seconds
+    if ttl is None:
+        return float('inf')
+    if isinstance(ttl, str):
+        return pd.Timedelta(ttl).total_seconds()
+    return float(ttl)
+
+
+def prepared_statement(sql):
+    # "... time >= :start AND time < :end;" -> (name, "... time >= $1 AND time < $2", ['start', 'end'])
+    sql = sql.strip().rstrip(';')
+    names = []
+
+    def number(match):
+        if match.group(1) not in names:
+            names.append(match.group(1))
+        return f'${names.index(match.group(1)) + 1}'
+
+    body = BIND_PARAM.sub(number, sql)
+    return 'stmt_' + hashlib.sha1(sql.encode()).hexdigest()[:16], body, names
+
+
+class QueryStats:
+    def __init__(self):
+        self.timings = {}
+        self.lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self.lock:
+            count, total, worst = self.timings.get(key, (0, 0.0, 0.0))
+            self.timings[key] = (count + 1, total + seconds, max(worst, seconds))
+
+    def snapshot(self):
+        with self.lock:
+            return {key: {'count': count, 'total_ms': total * 1000, 'mean_ms': total * 1000 / count, 'max_ms': worst * 1000}
+                    for key, (count, total, worst) in self.timings.items()}
+
+
+class Database:
+    def __init__(self, engine):
+        self.engine = engine
+        self.pool_wait = QueryStats()
+        self.latency = QueryStats()
+        self.cache = {}
+        self.cache_lock = threading.Lock()
+
+    @contextmanager
+    def connect(self):
+        with span('db.checkout'):
+            started = time.perf_counter()
+            conn = self.engine.connect()
+            self.pool_wait.record('checkout', time.perf_counter() - started)
+        with conn:
+            yield conn
+
+    def _execute(self, conn, sql, params, prepare, kwargs):
+        # PREPARE/EXECUTE is Postgres syntax; other engines (e.g. a SQLite stand-in) run the SQL as is
+        if not prepare or conn.dialect.name != 'postgresql':
+            return pd.read_sql(text(sql), conn, params=params, **kwargs)
+        name, body, names = prepared_statement(sql)
+        # conn.info lives as long as the pooled DBAPI connection, like the prepared statement
+        prepared = conn.info.setdefault('prepared', set())
+        if name not in prepared:
+            conn.exec_driver_sql(f'PREPARE {name} AS {body}')
+            conn.commit()
+            prepared.add(name)
+        execute = f"EXECUTE {name}({', '.join(f':{param}' for param in names)})" if names else f'EXECUTE {name}'
+        return pd.read_sql(text(execute), conn, params={param: params[param] for param in names}, **kwargs)
+
+    def query(self, sql, params=None, ttl=None, prepare=False, **kwargs):
+        # Drop-in for st.connection(...).query; kwargs go to pd.read_sql
+        params = params or {}
+        ttl = ttl_seconds(ttl)
+        key = (sql, tuple(sorted(params.items())), repr(sorted(kwargs.items())))
+        statement = ' '.join(sql.split())[:120]
+        with span('db.query', sql=statement) as trace:
+            if ttl > 0:
+                with self.cache_lock:
+                    expires, res = self.cache.get(key, (0, None))
+                if expires > time.monotonic():
+                    trace.update(cache='hit', rows=len(res))
+                    return res
+                trace['cache'] = 'miss'
+
+            started = time.perf_counter()
+            with self.connect() as conn:
+                res = self._execute(conn, sql, params, prepare, kwargs)
+            elapsed = time.perf_counter() - started
+            trace.update(rows=len(res), bytes=frame_bytes(res))
+        self.latency.record(statement, elapsed)
+        logger.debug('%.1f ms, %s rows: %s', elapsed * 1000, len(res), statement)
+
+        if ttl > 0:
+            with self.cache_lock:
+                now = time.monotonic()
+                self.cache = {k: v for k, v in self.cache.items() if v[0] > now}
+                while len(self.cache) >= QUERY_CACHE_ENTRIES:
+                    del self.cache[next(iter(self.cache))]
+                self.cache[key] = (now + ttl, res)
+        return res
+
+    def stream(self, sql, params=None, chunk_rows=100_000, **kwargs):
+        # Frames of at most chunk_rows from a named server-side cursor; the connection is
+        # held until the generator is exhausted or closed
+        statement = ' '.join(sql.split())[:120]
+        started = time.perf_counter()
+        with self.connect() as conn:
+            conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows)
+            chunks = pd.read_sql(text(sql), conn, params=params or {}, chunksize=chunk_rows, **kwargs)
+            while True:
+                # only the fetch is traced, not what the consumer does between chunks
+                with span('db.stream', sql=statement) as trace:
+                    chunk = next(chunks, None)
+                    if chunk is not None:
+                        trace.update(rows=len(chunk), bytes=frame_bytes(chunk))
+                if chunk is None:
+                    break
+                yield chunk
+        self.latency.record(statement, time.perf_counter() - started)
+
+    def stats(self):
+        return {
+            'pool': self.engine.pool.status(),
+            'pool_wait': self.pool_wait.snapshot(),
+            'queries': self.latency.snapshot(),
+        }
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def database():
+    # One Database (and pool) per process, shared by every session
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = Database(get_engine(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                                            pool_timeout=POOL_TIMEOUT, pool_pre_ping=True))
+        return _database
@@ -0,0 +1,48 @@
+"""Chart specs for the EDA page, driven by the ISO registry and a per-view table.
+
+One builder covers every ISO, table kind and view: the view decides titles, ticks
+and limits, the table kind decides between per-year load lines and a fuel-mix
+stack, and the ISO entry supplies the region name, fuel sources and colors.
+"""
+from electricity.charts import HOUR_TICKS, MONTH_TICKS, WEEKDAY_TICKS, Chart
+from electricity.isos import split_table
+from electricity.tracing import span
+
+# view -> (title suffix, x label, ticks, x limits)
+VIEW_AXES = {
+    'monthly': ('Monthly Averages', 'Month', MONTH_TICKS, (1, 12)),
+    'weekly': ('Daily Averages by Weekday', 'Weekday', WEEKDAY_TICKS, (0, 6)),
+    'daily': ('Hourly Averages', 'Hour of Day', HOUR_TICKS, (0, 23)),
+}
+
+
+def load_chart(iso, view, per_year, overall):
+    title, xlabel, xticks, xlim = VIEW_AXES[view]
+    chart = Chart(f'Historical {iso.region} Load Data - {title}', xlabel, 'Load (MW)',
+                  xticks=xticks, xlim=xlim, legend_title='Year')
+    # a range without rows has no per-year columns to plot: draw the empty axes
+    if not per_year.empty:
+        per_year = per_year['load']
+        chart.lines(per_year.index, per_year.to_numpy().T, [str(year) for year in per_year.columns], alpha=0.3)
+    if not overall.empty:
+        chart.line(overall.index, overall['load'], color='blue', linewidth=3, label='Average Load')
+    return chart
+
+
+def fuel_mix_chart(iso, view, per_year, overall):
+    title, xlabel, xticks, xlim = VIEW_AXES[view]
+    chart = Chart(f'Historical {iso.region} Fuel Mix - {title}', xlabel, 'Total Energy Generation (MW)',
+                  xticks=xticks, xlim=xlim, legend_title='Energy Sources')
+    if not overall.empty:
+        chart.stacked_bars(overall.index, overall[iso.fuel_sources].to_numpy().T, iso.fuel_sources, iso.colors)
+    return chart
+
+
+CHART_BUILDERS = {'load': load_chart, 'fuel_mix': fuel_mix_chart}
+
+
+def average_chart(table, view, per_year, overall):
+    # per_year / overall as returned by profile.view_averages(profile, view)
+    iso, kind = split_table(table)
+    with span('chart.build', table=table, view=view):
+        return CHART_BUILDERS[kind](iso, view, per_year, overall)
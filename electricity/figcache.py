@@ -0,0 +1,80 @@
+"""Bounded cache of rendered chart images.
+
+Server-rendered charts are kept as PNG (or SVG) bytes keyed by the chart's content
+digest and format, never as live matplotlib Figures. Entries are evicted least-recently-used first once
+either the entry count or the byte budget is exceeded, so resident memory is capped
+no matter how many date ranges viewers pick.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    def __init__(self, max_bytes, max_entries=256):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            image = self.entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image):
+        with self.lock:
+            if key in self.entries:
+                self.resident_bytes -= len(self.entries.pop(key))
+            if len(image) > self.max_bytes:
+                return
+            self.entries[key] = image
+            self.resident_bytes += len(image)
+            while self.resident_bytes > self.max_bytes or len(self.entries) > self.max_entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.resident_bytes -= len(evicted)
+                self.evictions += 1
+
+    def get_or_render(self, key, render):
+        # render() -> image bytes, only called on a miss
+        image = self.get(key)
+        if image is None:
+            image = render()
+            self.put(key, image)
+        return image
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'resident_bytes': self.resident_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def figure_to_bytes(fig, fmt='png', dpi=100):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=dpi)
+    return buffer.getvalue()
+
+
+def figure_to_png(fig, dpi=100):
+    return figure_to_bytes(fig, 'png', dpi)
+
+
+FIGURE_CACHE = FigureCache(max_bytes=int(os.environ.get('FIGURE_CACHE_MB', 64)) * 1024 * 1024)
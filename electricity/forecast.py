@@ -0,0 +1,245 @@
+"""Day-of load forecasts for every ISO, written to the ``forecast_dayof_<iso>`` tables.
+
+The model is a seasonal regression on the 5-minute load: daily harmonics (separate
+for weekdays and weekends), weekly and yearly harmonics. It is fitted by least
+squares from running sums (X'WX, X'Wy, y'Wy), where older rows are down-weighted
+with a half-life of ``HALF_LIFE_DAYS``. Those sums are the model state, kept in
+``FORECAST_STATE_DIR`` between cycles, so a cycle warm-starts from the previous fit
+and only folds in the actuals that arrived since. The latest residuals shift the
+rest of the day, fading out over a few hours.
+
+Each cycle reads the new actuals, fits and forecasts every ISO in a process pool,
+then writes all forecast tables in one transaction (COPY + upsert on ``ds``).
+
+    python -m electricity.forecast                  # one cycle for every ISO
+    python -m electricity.forecast --isos caiso nyiso --workers 2
+    python -m electricity.forecast --watch          # a cycle whenever load rows land
+"""
+import argparse
+import datetime
+import logging
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from electricity import parquet_store
+from electricity.isos import ISOS
+from electricity.tracing import span
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = os.environ.get('FORECAST_STATE_DIR',
+                           os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'forecast'))
+
+# Actuals read for a cold start
+HISTORY_DAYS = 365
+
+HALF_LIFE_DAYS = 90
+
+# Harmonics per seasonality
+DAILY_TERMS = 6
+WEEKLY_TERMS = 3
+YEARLY_TERMS = 3
+
+RIDGE = 1e-6
+
+# z of the 80% interval, the interval width Prophet used by default
+INTERVAL_Z = 1.2816
+
+# The day-of correction is the mean residual of the last hour, halved every BIAS_HALF_LIFE_HOURS
+BIAS_ROWS = 12
+BIAS_HALF_LIFE_HOURS = 3
+
+STEP = pd.Timedelta(minutes=5)
+
+### Model
+
+def features(times):
+    # DatetimeIndex -> design matrix, one row per timestamp
+    # days since the epoch, whatever the resolution of the index (pandas 3 infers us or s)
+    days = ((times - pd.Timestamp(0, tz=times.tz)) / pd.Timedelta(days=1)).to_numpy(dtype='float64')
+    # 1970-01-01 was a Thursday
+    weekend = ((np.floor(days) + 3) % 7 >= 5).astype('float64')
+    columns = [np.ones_like(days), weekend]
+    for k in range(1, DAILY_TERMS + 1):
+        daily = [np.sin(2 * np.pi * k * days), np.cos(2 * np.pi * k * days)]
+        columns += daily + [column * weekend for column in daily]
+    for period, terms in ((7, WEEKLY_TERMS), (365.25, YEARLY_TERMS)):
+        for k in range(1, terms + 1):
+            columns += [np.sin(2 * np.pi * k * days / period), np.cos(2 * np.pi * k * days / period)]
+    return np.column_stack(columns)
+
+
+def empty_state(tz):
+    n = features(pd.DatetimeIndex([0])).shape[1]
+    return {'xtx': np.zeros((n, n)), 'xty': np.zeros(n), 'yy': 0.0, 'weight': 0.0,
+            'last_time': None, 'tz': tz, 'residuals': np.zeros(0)}
+
+
+def coefficients(state):
+    ridge = RIDGE * max(state['weight'], 1.0) * np.eye(len(state['xty']))
+    return np.linalg.solve(state['xtx'] + ridge, state['xty'])
+
+
+def residual_std(state, beta):
+    # weighted residual variance straight from the running sums
+    sse = state['yy'] - 2 * beta @ state['xty'] + beta @ state['xtx'] @ beta
+    return float(np.sqrt(max(sse, 0.0) / state['weight'])) if state['weight'] else 0.0
+
+
+def update(state, times, y):
+    # Decay the sums to the newest timestamp, then add the new rows
+    end = times[-1]
+    if state['last_time'] is not None:
+        decay = 0.5 ** ((end - state['last_time']) / pd.Timedelta(days=HALF_LIFE_DAYS))
+        for key in ('xtx', 'xty', 'yy', 'weight'):
+            state[key] = state[key] * decay
+    w = 0.5 ** ((end - times) / pd.Timedelta(days=HALF_LIFE_DAYS)).to_numpy()
+    x = features(times)
+    xw = x * w[:, None]
+    state['xtx'] = state['xtx'] + x.T @ xw
+    state['xty'] = state['xty'] + xw.T @ y
+    state['yy'] = state['yy'] + float(w @ (y * y))
+    state['weight'] = state['weight'] + float(w.sum())
+    state['last_time'] = end
+    return state
+
+
+def fit_and_forecast(state, times, y, day):
+    # Runs in a worker process: fold the new actuals into state, score the previous fit
+    # on them and forecast `day`. -> (state, forecast frame, MAPE of the new actuals or None)
+    tz = None if times.empty else str(times.tz) if times.tz is not None else None
+    state = state or empty_state(tz)
+    score = None
+    if not times.empty:
+        if state['weight']:
+            predicted = features(times) @ coefficients(state)
+            score = float(np.mean(np.abs(predicted - y) / np.maximum(np.abs(y), 1.0)))
+        state = update(state, times, y)
+        residuals = y - features(times) @ coefficients(state)
+        state['residuals'] = np.concatenate([state['residuals'], residuals])[-BIAS_ROWS:]
+
+    ds = pd.date_range(day, periods=int(pd.Timedelta(days=1) / STEP), freq=STEP, tz=state['tz'])
+    beta = coefficients(state)
+    yhat = features(ds) @ beta
+    if len(state['residuals']) and state['last_time'] is not None:
+        hours_ahead = np.maximum((ds - state['last_time']) / pd.Timedelta(hours=1), 0)
+        yhat += state['residuals'].mean() * 0.5 ** (hours_ahead / BIAS_HALF_LIFE_HOURS)
+    spread = INTERVAL_Z * residual_std(state, beta)
+    forecast = pd.DataFrame({'ds': ds, 'yhat': yhat, 'yhat_lower': yhat - spread, 'yhat_upper': yhat + spread})
+    return state, forecast, score
+
+
+### State
+
+def state_path(key):
+    return os.path.join(STATE_DIR, f'{key}.pickle')
+
+
+def load_state(key):
+    try:
+        with open(state_path(key), 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_state(key, state):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    # write then rename, so a crash never leaves half a state behind
+    with open(state_path(key) + '.tmp', 'wb') as f:
+        pickle.dump(state, f)
+    os.replace(state_path(key) + '.tmp', state_path(key))
+
+
+### Cycles
+
+def new_actuals(conn, iso, state):
+    # Load rows after the last one already in state, or the last HISTORY_DAYS on a cold start
+    if state is None or state['last_time'] is None:
+        start = datetime.date.today() - datetime.timedelta(days=HISTORY_DAYS)
+    else:
+        start = state['last_time'].date()
+    rows = parquet_store.read_range(conn, iso.load_table, start, None, ['load'], ttl=0)
+    rows = rows.dropna(subset=['load'])
+    if state is not None and state['last_time'] is not None:
+        rows = rows[rows['time'] > state['last_time']]
+    return pd.DatetimeIndex(rows['time']), rows['load'].to_numpy(dtype='float64')
+
+
+def run_cycle(engine, isos, pool, day=None):
+    # One forecast per ISO; -> {iso key: MAPE of the previous fit on the new actuals}
+    from electricity.db import Database
+    from electricity.ingest import copy_upsert_tables
+    from electricity.migrations import ensure_table
+
+    day = day or datetime.date.today()
+    conn = Database(engine)
+    jobs = {}
+    with span('forecast.read'):
+        for iso in isos:
+            state = load_state(iso.key)
+            times, y = new_actuals(conn, iso, state)
+            if state is None and times.empty:
+                logger.warning('%s: no load data to fit', iso.key)
+                continue
+            jobs[iso.key] = pool.submit(fit_and_forecast, state, times, y, day)
+
+    forecasts, scores = {}, {}
+    with span('forecast.fit'):
+        for key, job in jobs.items():
+            state, forecasts[ISOS[key].forecast_table], scores[key] = job.result()
+            save_state(key, state)
+
+    with span('forecast.write') as trace:
+        with engine.begin() as db:
+            for table in forecasts:
+                ensure_table(db, table, day, day + datetime.timedelta(days=1))
+        trace['rows'] = sum(copy_upsert_tables(engine, forecasts).values())
+    return scores
+
+
+def watch(engine, isos, pool):
+    # A cycle at start, then one per batch of NOTIFYs from the load tables
+    from electricity.notify import NotifyListener
+
+    load_tables = {iso.load_table for iso in isos}
+    pending = threading.Event()
+
+    def notified(tables):
+        # None: (re)connected, rows may have landed in the meantime
+        if tables is None or tables & load_tables:
+            pending.set()
+
+    NotifyListener(engine, notified).start()
+    while True:
+        pending.wait()
+        pending.clear()
+        try:
+            logger.info('forecast errors: %s', run_cycle(engine, isos, pool))
+        except Exception:
+            logger.exception('forecast cycle failed')
+
+
+if __name__ == '__main__':
+    from electricity.db import get_engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--isos', nargs='+', default=list(ISOS), choices=list(ISOS))
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--watch', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    engine = get_engine()
+    isos = [ISOS[key] for key in args.isos]
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(isos))) as pool:
+        if args.watch:
+            watch(engine, isos, pool)
+        else:
+            for key, score in run_cycle(engine, isos, pool).items():
+                print(f"{key}: {'cold start' if score is None else f'MAPE {score:.2%} on new actuals'}")
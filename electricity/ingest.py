@@ -0,0 +1,192 @@
+"""Ingestion of ISO load and fuel-mix data from gridstatus into Postgres.
+
+Frames are normalized to the declared table schemas, streamed into a temporary
+table with ``COPY FROM STDIN`` and merged with ``INSERT ... ON CONFLICT (time) DO
+UPDATE`` (``ds`` for the forecast tables), so re-running any range is safe. Backfills are split into chunks that
+are downloaded in parallel; afterwards the rollups and Parquet partitions of the months
+a backfill touched are rebuilt from the new rows.
+
+    python -m electricity.ingest latest
+    python -m electricity.ingest backfill 2024-01-01 2024-07-01 [--tables nyiso_load ...] [--fixtures DIR]
+
+``--fixtures DIR`` reads ``DIR/<table>.csv`` instead of calling the ISO APIs.
+"""
+import argparse
+import datetime
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from electricity import parquet_store, schemas
+from electricity.isos import split_table
+from electricity.migrations import ensure_table
+from electricity.rollups import refresh_months
+
+logger = logging.getLogger(__name__)
+
+BATCH_ROWS = 50_000
+
+# Days per download; 5-minute fuel mix responses get large quickly
+CHUNK_DAYS = 7
+
+
+### Sources
+
+class GridstatusSource:
+    def fetch(self, table, start, end=None):
+        # start may also be 'today' / 'latest', as gridstatus accepts
+        import gridstatus
+
+        entry, kind = split_table(table)
+        iso = getattr(gridstatus, entry.gridstatus)()
+        if kind == 'load':
+            return iso.get_load(start, end=end)
+        return iso.get_fuel_mix(start, end=end)
+
+
+class FixtureSource:
+    # Stand-in for the ISO APIs: DIR/<table>.csv files in gridstatus' own column layout
+    def __init__(self, directory):
+        self.directory = directory
+
+    def fetch(self, table, start, end=None):
+        res = pd.read_csv(os.path.join(self.directory, f'{table}.csv'))
+        times = pd.to_datetime(res['Time'], utc=True)
+        if start not in ('today', 'latest'):
+            mask = times >= pd.Timestamp(start, tz='UTC')
+            if end is not None:
+                mask &= times < pd.Timestamp(end, tz='UTC')
+            res = res[mask]
+        return res
+
+
+### Normalizing and loading
+
+def normalize(frame, table):
+    # gridstatus columns ('Time', 'Natural Gas', ...) -> the declared schema (time, natural_gas, ...)
+    frame = frame.rename(columns=lambda column: column.strip().lower().replace(' ', '_'))
+    frame = frame.assign(time=pd.to_datetime(frame['time'], utc=True))
+    for column in schemas.value_columns(table):
+        if column not in frame.columns:
+            frame[column] = float('nan')
+    frame = schemas.compact(frame, table)
+    return frame.dropna(subset=['time']).drop_duplicates(subset='time', keep='last').sort_values(by='time')
+
+
+def copy_merge(cursor, table, frame):
+    # COPY the frame into a temp table in batches, then merge it in one statement
+    table = schemas.checked_table(table)
+    time = schemas.time_column(table)
+    columns = list(frame.columns)
+    column_list = ', '.join(columns)
+    updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in columns if column != time)
+
+    cursor.execute(f"CREATE TEMP TABLE staging_{table} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP;")
+    for start in range(0, len(frame), BATCH_ROWS):
+        buffer = io.StringIO()
+        frame.iloc[start:start + BATCH_ROWS].to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S%z')
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY staging_{table} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+    cursor.execute(f"""
+        INSERT INTO {table} ({column_list}) SELECT {column_list} FROM staging_{table}
+        ON CONFLICT ({time}) DO UPDATE SET {updates};
+    """)
+
+
+def copy_upsert_tables(engine, frames):
+    # {table: frame} merged in one transaction; -> {table: rows written}
+    frames = {table: frame for table, frame in frames.items() if not frame.empty}
+    if not frames:
+        return {}
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cursor:
+            for table, frame in frames.items():
+                copy_merge(cursor, table, frame)
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    return {table: len(frame) for table, frame in frames.items()}
+
+
+def copy_upsert(engine, table, frame):
+    return copy_upsert_tables(engine, {table: frame}).get(table, 0)
+
+
+### Jobs
+
+def ingest_latest(engine, source, tables=schemas.DATA_TABLES):
+    # Today's data for every table: the 5-minute realtime refresh
+    with engine.begin() as conn:
+        for table in tables:
+            ensure_table(conn, table)
+    written = {}
+    with ThreadPoolExecutor(max_workers=len(tables)) as pool:
+        futures = {pool.submit(source.fetch, table, 'today'): table for table in tables}
+        for future in as_completed(futures):
+            table = futures[future]
+            written[table] = copy_upsert(engine, table, normalize(future.result(), table))
+    return written
+
+
+def chunks(start, end, days=CHUNK_DAYS):
+    while start < end:
+        chunk_end = min(start + datetime.timedelta(days=days), end)
+        yield start, chunk_end
+        start = chunk_end
+
+
+def backfill(engine, source, start, end, tables=schemas.DATA_TABLES, max_workers=4):
+    # Download [start, end) in parallel chunks, load each as soon as it arrives
+    with engine.begin() as conn:
+        for table in tables:
+            ensure_table(conn, table, start, end)
+
+    written = dict.fromkeys(tables, 0)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(source.fetch, table, chunk_start, chunk_end): (table, chunk_start, chunk_end)
+                   for table in tables for chunk_start, chunk_end in chunks(start, end)}
+        for future in as_completed(futures):
+            table, chunk_start, chunk_end = futures[future]
+            rows = copy_upsert(engine, table, normalize(future.result(), table))
+            written[table] += rows
+            logger.info('%s %s..%s: %s rows', table, chunk_start, chunk_end, rows)
+
+    # Closed months in the range may have changed: re-fold their rollups and rewrite their Parquet copies
+    with engine.begin() as conn:
+        for table in tables:
+            refresh_months(conn, table, start, end)
+    for table in tables:
+        parquet_store.resync_range(engine, table, start, end)
+    return written
+
+
+if __name__ == '__main__':
+    from electricity.db import get_engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=['latest', 'backfill'])
+    parser.add_argument('start', nargs='?', type=datetime.date.fromisoformat)
+    parser.add_argument('end', nargs='?', type=datetime.date.fromisoformat)
+    parser.add_argument('--tables', nargs='+', default=schemas.DATA_TABLES)
+    parser.add_argument('--fixtures')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    engine = get_engine()
+    source = FixtureSource(args.fixtures) if args.fixtures else GridstatusSource()
+    if args.mode == 'latest':
+        written = ingest_latest(engine, source, args.tables)
+    else:
+        if args.start is None or args.end is None:
+            parser.error('backfill needs a start and an end date')
+        written = backfill(engine, source, args.start, args.end, args.tables, args.workers)
+    for table, rows in written.items():
+        print(f'{table}: {rows} rows')
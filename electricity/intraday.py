@@ -0,0 +1,60 @@
+"""Append-only cache of the current operating day for the realtime dashboard.
+
+Rows come from the table's ``<table>_current_day`` view, which already resolves
+whether the operating day is today or (while today has no rows yet) yesterday.
+The first request loads the view in full; every refresh after that only asks for
+rows newer than the last one already held. When the view moves on to a new day the
+new rows replace the old day.
+"""
+import threading
+
+import pandas as pd
+
+from electricity import schemas
+from electricity.tracing import span
+
+
+class IntradayCache:
+    def __init__(self, table):
+        self.table = table
+        self.column = schemas.time_column(table)
+        self.day = None
+        self.rows = None
+        self.lock = threading.Lock()
+
+    def _query(self, conn, after=None):
+        view = schemas.checked_table(schemas.current_day_view(self.table))
+        sql = f"SELECT operating_day, {schemas.select_list(self.table)} FROM {view}"
+        if after is not None:
+            sql += f" WHERE {self.column} > :after"
+        # ttl=0: this cache decides what is fresh, not the query cache
+        res = conn.query(sql + ';', params={'after': after}, ttl=0, prepare=True,
+                         **schemas.read_kwargs(self.table))
+        with span('intraday.sort', table=self.table, rows=len(res)):
+            return res.sort_values(by=self.column)
+
+    def get(self, conn):
+        # -> (operating day or None while the view is empty, rows of that day)
+        with self.lock, span('intraday.get', table=self.table) as trace:
+            if self.rows is None or self.rows.empty:
+                trace['cache'] = 'miss'
+                new = self._query(conn)
+            else:
+                # only the rows since the last refresh are read
+                trace['cache'] = 'hit'
+                last_seen = pd.Timestamp(self.rows[self.column].iloc[-1]).to_pydatetime()
+                new = self._query(conn, after=last_seen)
+            trace['rows'] = len(new)
+
+            if not new.empty:
+                day = new['operating_day'].iloc[0]
+                new = new.drop(columns='operating_day').reset_index(drop=True)
+                if day == self.day and self.rows is not None:
+                    self.rows = pd.concat([self.rows, new], ignore_index=True)
+                else:
+                    # every row of a newer day is newer than last_seen, so `new` is the whole day
+                    self.rows = new
+                self.day = day
+            elif self.rows is None:
+                self.rows = new.drop(columns='operating_day')
+            return self.day, self.rows
@@ -0,0 +1,87 @@
+"""Registry of the ISOs the app covers.
+
+Everything that differs per ISO (tab label, region name, gridstatus class, fuel
+sources and their colors) lives in one ``Iso`` entry. Table names, schemas and
+charts are derived from the registry, so adding an ISO that gridstatus supports
+(ERCOT, PJM, MISO, SPP, ...) means adding an entry here and loading its tables.
+
+``ISO_LIST`` (comma-separated keys, in display order) picks which of them the
+pages show; the default is ``isone,caiso,nyiso``.
+"""
+import datetime
+import os
+from functools import cached_property
+
+
+class Iso:
+    def __init__(self, key, label, region, gridstatus, fuel_sources, history, colormap='tab20c'):
+        self.key = key
+        self.label = label
+        self.region = region
+        # class name in the gridstatus package
+        self.gridstatus = gridstatus
+        self.fuel_sources = fuel_sources
+        # table kind -> (first date with data, default EDA start date)
+        self.history = history
+        self.colormap = colormap
+
+    def table(self, kind):
+        return f'{self.key}_{kind}'
+
+    @property
+    def tables(self):
+        return [self.load_table, self.fuel_mix_table]
+
+    @property
+    def load_table(self):
+        return self.table('load')
+
+    @property
+    def fuel_mix_table(self):
+        return self.table('fuel_mix')
+
+    @property
+    def forecast_table(self):
+        return f'forecast_dayof_{self.key}'
+
+    @cached_property
+    def colors(self):
+        # one RGBA row per fuel source, evenly spread over the colormap
+        from matplotlib import colormaps
+
+        n = len(self.fuel_sources)
+        return colormaps[self.colormap].resampled(n)(range(n))
+
+
+ISOS = {iso.key: iso for iso in [
+    Iso('nyiso', 'NYISO', 'New York', 'NYISO',
+        ['dual_fuel', 'hydro', 'natural_gas', 'nuclear', 'other_fossil_fuels', 'other_renewables', 'wind'],
+        {'load': (datetime.date(2002, 1, 1), datetime.date(2021, 1, 1)),
+         'fuel_mix': (datetime.date(2018, 1, 1), datetime.date(2021, 1, 1))}),
+    Iso('caiso', 'CAISO', 'California', 'CAISO',
+        ['solar', 'wind', 'geothermal', 'biomass', 'biogas', 'small_hydro', 'coal', 'nuclear', 'natural_gas',
+         'large_hydro', 'batteries', 'imports', 'other'],
+        {'load': (datetime.date(2002, 1, 1), datetime.date(2021, 1, 1)),
+         'fuel_mix': (datetime.date(2019, 1, 1), datetime.date(2021, 1, 1))}),
+    Iso('isone', 'ISONE', 'New England', 'ISONE',
+        ['coal', 'hydro', 'landfill_gas', 'natural_gas', 'nuclear', 'oil', 'refuse', 'solar', 'wind', 'wood', 'other'],
+        {'load': (datetime.date(2022, 7, 1), datetime.date(2023, 1, 1)),
+         'fuel_mix': (datetime.date(2018, 1, 1), datetime.date(2021, 1, 1))}),
+]}
+
+ISO_LIST = [key.strip() for key in os.environ.get('ISO_LIST', 'isone,caiso,nyiso').split(',') if key.strip()]
+
+
+def enabled_isos():
+    # Registry entries the pages show, in display order
+    return [ISOS[key] for key in ISO_LIST]
+
+
+def split_table(table):
+    # 'caiso_fuel_mix' -> (ISOS['caiso'], 'fuel_mix')
+    key, _, kind = table.partition('_')
+    return ISOS[key], kind
+
+
+def iso_of(table):
+    return split_table(table)[0]
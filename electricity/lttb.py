@@ -0,0 +1,53 @@
+"""Largest-triangle-three-buckets downsampling for long time series.
+
+Keeps the first and last point and, from each of ``threshold - 2`` equal buckets in
+between, the point forming the largest triangle with the previously kept point and
+the average of the next bucket. Peaks and troughs survive, so a line drawn from
+a few hundred points looks like the one drawn from every row.
+"""
+import numpy as np
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(float)
+    if values.dtype == object:
+        # e.g. tz-aware pandas timestamps
+        return np.array([v.timestamp() for v in values], dtype=float)
+    return values.astype(float)
+
+
+def lttb_indices(x, y, threshold):
+    # -> sorted positions of the points to keep
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = np.nan_to_num(_as_float(y))
+    every = (n - 2) / (threshold - 2)
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        if end >= next_end:
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        keep[i + 1] = a
+    return keep
+
+
+def lttb(x, y, threshold):
+    # -> (x, y) reduced to at most threshold points
+    keep = lttb_indices(x, y, threshold)
+    return np.asarray(x)[keep], np.asarray(y)[keep]
@@ -0,0 +1,215 @@
+"""Schema for the ISO tables: monthly range partitions on the time column.
+
+Every page query filters on ``time`` (``ds`` for forecasts), so each table is
+partitioned by month on that column, with a unique B-tree index (for upserts and
+short ranges) and a BRIN index (for multi-year scans). Range queries then only
+touch the partitions they overlap.
+
+    python -m electricity.migrations            # apply pending migrations
+    python -m electricity.migrations --status   # list applied migrations
+
+Migration 1 creates missing tables and converts existing plain tables, keeping the
+originals as ``<table>_unpartitioned``.
+Migration 2 adds a ``<table>_current_day`` view per ISO table, holding today's rows
+or yesterday's while today has none, and a trigger that sends ``NOTIFY iso_data,
+'<table>'`` after every insert.
+Migration 3 creates the (empty) EDA rollup tables.
+"""
+import argparse
+import datetime
+
+from sqlalchemy import text
+
+from electricity import schemas
+from electricity.rollups import CREATE_ROLLUP_TABLES, month_floor
+
+ISO_TABLES = schemas.DATA_TABLES + schemas.FORECAST_TABLES
+
+# Partitions are kept this many months ahead of today
+MONTHS_AHEAD = 2
+
+NOTIFY_CHANNEL = 'iso_data'
+
+
+def next_month(month):
+    return month_floor(month + datetime.timedelta(days=31))
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def table_kind(conn, table):
+    # 'p' partitioned, 'r' plain table, None missing
+    return conn.execute(text("SELECT relkind FROM pg_class WHERE relname = :table AND relkind IN ('p', 'r');"),
+                        {'table': table}).scalar()
+
+
+def create_partitioned_table(conn, table):
+    table = schemas.checked_table(table)
+    time = schemas.time_column(table)
+    values = ', '.join(f'{column} real' for column in schemas.value_columns(table))
+    conn.execute(text(f"""
+        CREATE TABLE {table} ({time} timestamptz NOT NULL, {values}, CONSTRAINT {table}_{time}_key UNIQUE ({time}))
+        PARTITION BY RANGE ({time});
+    """))
+    conn.execute(text(f"CREATE INDEX {table}_{time}_brin ON {table} USING brin ({time});"))
+
+
+def ensure_partitions(conn, table, start, end):
+    # Monthly partitions covering [start, end)
+    table = schemas.checked_table(table)
+    month = month_floor(start)
+    while month < end:
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table}
+            FOR VALUES FROM ('{month}') TO ('{next_month(month)}');
+        """))
+        month = next_month(month)
+
+
+def ensure_table(conn, table, start=None, end=None):
+    # Partitioned table with partitions for [start, end) and the next MONTHS_AHEAD months
+    table = schemas.checked_table(table)
+    if table_kind(conn, table) is None:
+        create_partitioned_table(conn, table)
+    if table_kind(conn, table) == 'r':
+        # not converted yet: upserts still need a unique index on the time column
+        time = schemas.time_column(table)
+        index = f'{table}_{time}_key'
+        if conn.execute(text("SELECT to_regclass(:index);"), {'index': index}).scalar() is None:
+            # duplicate timestamps would fail the index: keep the one stored last (highest ctid),
+            # like convert_table
+            conn.execute(text(f"DELETE FROM {table} a USING {table} b WHERE a.{time} = b.{time} AND a.ctid < b.ctid;"))
+            conn.execute(text(f"CREATE UNIQUE INDEX {index} ON {table} ({time});"))
+        return
+    today = datetime.date.today()
+    horizon = month_floor(today)
+    for _ in range(MONTHS_AHEAD):
+        horizon = next_month(horizon)
+    ensure_partitions(conn, table, min(start or today, today), max(end or horizon, horizon))
+
+
+def convert_table(conn, table):
+    # Plain table -> partitioned table of the same name, rows copied over in one transaction;
+    # the plain table stays behind as <table>_unpartitioned
+    table = schemas.checked_table(table)
+    time = schemas.time_column(table)
+    columns = ', '.join([time] + schemas.value_columns(table))
+    first, last = conn.execute(text(f"SELECT min({time}), max({time}) FROM {table};")).one()
+
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned;"))
+    conn.execute(text(f"DROP INDEX IF EXISTS {table}_{time}_key;"))
+    create_partitioned_table(conn, table)
+    if first is None:
+        ensure_table(conn, table)
+    else:
+        ensure_table(conn, table, first.date(), last.date() + datetime.timedelta(days=1))
+    # one row per timestamp if the old table had duplicates: the one stored last (highest ctid)
+    conn.execute(text(f"""
+        INSERT INTO {table} ({columns})
+        SELECT DISTINCT ON ({time}) {columns} FROM {table}_unpartitioned ORDER BY {time}, ctid DESC;
+    """))
+    # Not dropped: it still has the columns the new table does not declare (index, the CAISO
+    # interval_start/interval_end) and the values before the cast to real
+
+
+### Migrations
+
+def partition_iso_tables(conn):
+    for table in ISO_TABLES:
+        if table_kind(conn, table) == 'r':
+            convert_table(conn, table)
+        else:
+            ensure_table(conn, table)
+
+
+def create_current_day_views(conn):
+    # The operating day is today once it has a row, yesterday until then
+    for table in map(schemas.checked_table, schemas.DATA_TABLES):
+        columns = ', '.join(f't.{column}' for column in schemas.columns(table))
+        conn.execute(text(f"""
+            CREATE OR REPLACE VIEW {schemas.current_day_view(table)} AS
+            SELECT day.operating_day, {columns}
+            FROM (SELECT CASE WHEN EXISTS (SELECT 1 FROM {table} WHERE time >= current_date)
+                              THEN current_date ELSE current_date - 1 END AS operating_day) AS day
+            JOIN {table} t ON t.time >= day.operating_day AND t.time < day.operating_day + 1;
+        """))
+
+
+def create_notify_triggers(conn):
+    # One notification per statement (a COPY upsert is one statement), payload is the table name
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION notify_iso_data() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_notify('{NOTIFY_CHANNEL}', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$;
+    """))
+    for table in map(schemas.checked_table, ISO_TABLES):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_notify ON {table};"))
+        conn.execute(text(f"""
+            CREATE TRIGGER {table}_notify AFTER INSERT ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_iso_data();
+        """))
+
+
+def current_day_push(conn):
+    create_current_day_views(conn)
+    create_notify_triggers(conn)
+
+
+def create_rollup_tables(conn):
+    conn.execute(text(CREATE_ROLLUP_TABLES))
+
+
+MIGRATIONS = [
+    (1, 'monthly range partitions with B-tree and BRIN time indexes', partition_iso_tables),
+    (2, 'current operating day views and NOTIFY on insert', current_day_push),
+    (3, 'EDA rollup tables', create_rollup_tables),
+]
+
+
+def applied_versions(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version integer PRIMARY KEY,
+            description text NOT NULL,
+            applied_at timestamptz NOT NULL DEFAULT now()
+        );
+    """))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations;"))}
+
+
+def migrate(engine):
+    # Each migration runs in its own transaction together with its bookkeeping row
+    applied = []
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    for version, description, migration in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            migration(conn)
+            conn.execute(text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description);"),
+                         {'version': version, 'description': description})
+        applied.append(version)
+    return applied
+
+
+if __name__ == '__main__':
+    from electricity.db import get_engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--status', action='store_true')
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if args.status:
+        with engine.begin() as conn:
+            done = applied_versions(conn)
+        for version, description, _ in MIGRATIONS:
+            print(f"{version}: {'applied' if version in done else 'pending'} - {description}")
+    else:
+        print(f'applied: {migrate(engine) or "nothing to do"}')
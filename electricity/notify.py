@@ -0,0 +1,69 @@
+"""Background ``LISTEN`` on the channel the ISO table triggers notify.
+
+Every insert into an ISO table sends ``NOTIFY iso_data, '<table>'`` (see
+migration 2). The listener holds one dedicated connection outside the pool and
+hands each batch of notified table names to a callback, so the dashboard refreshes
+when rows land instead of on a blind timer.
+"""
+import logging
+import select
+import threading
+import time
+
+from electricity.migrations import NOTIFY_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+# Seconds between reconnect attempts after the connection drops
+RETRY_SECONDS = 10
+
+
+class NotifyListener:
+    def __init__(self, engine, callback, channel=NOTIFY_CHANNEL, timeout=60):
+        # callback(tables) is called from the listener thread with a set of table names
+        self.engine = engine
+        self.callback = callback
+        self.channel = channel
+        self.timeout = timeout
+        self._thread = None
+
+    def _connect(self):
+        # A pooled connection would keep LISTENing after being handed back, so detach it
+        raw = self.engine.raw_connection()
+        raw.detach()
+        conn = raw.dbapi_connection
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {self.channel};')
+        return conn
+
+    def _listen(self, conn):
+        while True:
+            if select.select([conn], [], [], self.timeout) == ([], [], []):
+                continue
+            conn.poll()
+            tables = {notify.payload for notify in conn.notifies}
+            conn.notifies.clear()
+            if tables:
+                self.callback(tables)
+
+    def _run(self):
+        while True:
+            conn = None
+            try:
+                conn = self._connect()
+                # anything may have landed while we were not listening
+                self.callback(None)
+                self._listen(conn)
+            except Exception:
+                logger.exception('LISTEN %s failed, reconnecting in %ss', self.channel, RETRY_SECONDS)
+            finally:
+                if conn is not None:
+                    conn.close()
+            time.sleep(RETRY_SECONDS)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='notify-listener', daemon=True)
+            self._thread.start()
+        return self
@@ -0,0 +1,182 @@
+"""Local columnar copy of the historical ISO tables, one Parquet file per table per month.
+
+A closed month never changes, so once its partition is on disk it is read from there
+(memory-mapped, only the requested columns) instead of being pulled from Postgres
+again. Whatever part of a range has no local partition (the still-open tail, months
+not synced yet or deleted) is queried from Postgres.
+
+Sync new closed months with::
+
+    python -m electricity.parquet_store [table ...]
+"""
+import datetime
+import os
+import sys
+
+import pandas as pd
+from sqlalchemy import text
+
+from electricity import schemas
+from electricity.queries import time_filter
+from electricity.rollups import month_floor
+
+STORE_DIR = os.environ.get('PARQUET_STORE_DIR',
+                           os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'parquet'))
+
+
+def next_month(month):
+    return month_floor(month + datetime.timedelta(days=31))
+
+
+def partition_path(table, month):
+    return os.path.join(STORE_DIR, table, f'{month:%Y-%m}.parquet')
+
+
+def partition_months(table):
+    directory = os.path.join(STORE_DIR, table)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(datetime.datetime.strptime(name[:-len('.parquet')], '%Y-%m').date()
+                  for name in os.listdir(directory) if name.endswith('.parquet'))
+
+
+### Syncing from Postgres
+
+def write_partition(engine, table, month):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = partition_path(table, month)
+    # the UTC month, the same one _within cuts the local rows at
+    where, params = time_filter(month, next_month(month))
+    res = pd.read_sql(text(f"SELECT {schemas.select_list(table)} FROM {schemas.checked_table(table)} WHERE {where} ORDER BY time;"),
+                      engine, params=params, **schemas.read_kwargs(table))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # write then rename, so a reader never sees a half-written partition
+    pq.write_table(pa.Table.from_pandas(res, preserve_index=False), path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def sync_table(engine, table):
+    with engine.connect() as conn:
+        first = conn.execute(text(f"SELECT min(time) FROM {schemas.checked_table(table)};")).scalar()
+    if first is None:
+        return 0
+
+    through = month_floor(datetime.date.today())
+    month = month_floor(pd.Timestamp(first))
+    written = 0
+    while month < through:
+        if not os.path.exists(partition_path(table, month)):
+            write_partition(engine, table, month)
+            written += 1
+        month = next_month(month)
+    return written
+
+
+def resync_range(engine, table, start, end):
+    # Rewrite the partitions already on disk that overlap [start, end), e.g. after a backfill
+    months = [month for month in partition_months(table) if month < end and next_month(month) > start]
+    for month in months:
+        write_partition(engine, table, month)
+    return len(months)
+
+
+### Reading
+
+def time_bound(day, times):
+    # date -> timestamp comparable with the (possibly tz-aware) time column
+    bound = pd.Timestamp(day)
+    if times.dt.tz is not None:
+        bound = bound.tz_localize(times.dt.tz)
+    return bound
+
+
+def _columns(table, columns):
+    if columns is None:
+        return schemas.columns(table)
+    if 'time' not in columns:
+        return ['time'] + list(columns)
+    return columns
+
+
+def _plan(table, timemin, timemax):
+    # -> (local partition months, [start, end) gaps between them to read from Postgres);
+    #    the last gap's end is None for an open range
+    months = [m for m in partition_months(table) if next_month(m) > timemin and (timemax is None or m < timemax)]
+    gaps = []
+    cursor = timemin
+    for month in months:
+        if month > cursor:
+            gaps.append((cursor, month))
+        cursor = max(cursor, next_month(month))
+    if timemax is None or cursor < timemax:
+        gaps.append((cursor, timemax))
+    return months, gaps
+
+
+def _within(frame, timemin, timemax):
+    mask = frame['time'] >= time_bound(timemin, frame['time'])
+    if timemax is not None:
+        mask &= frame['time'] < time_bound(timemax, frame['time'])
+    return frame[mask]
+
+
+def _remote_query(table, columns, start, timemax):
+    # -> (sql, params) for the rows of one gap between local partitions, in UTC days like _within
+    select = '*' if columns is None else ', '.join(columns)
+    where, params = time_filter(start, timemax)
+    return f"SELECT {select} FROM {schemas.checked_table(table)} WHERE {where};", params
+
+
+def read_range(conn, table, timemin, timemax, columns=None, ttl="10m"):
+    # Rows of [timemin, timemax) from local partitions plus Postgres for the gaps between them
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = _columns(table, columns)
+    months, gaps = _plan(table, timemin, timemax)
+
+    frames = []
+    if months:
+        local = pa.concat_tables([pq.read_table(partition_path(table, m), columns=columns, memory_map=True)
+                                  for m in months]).to_pandas()
+        frames.append(_within(schemas.compact(local, table), timemin, timemax))
+
+    for start, end in gaps:
+        sql, params = _remote_query(table, columns, start, end)
+        frames.append(conn.query(sql, params=params, ttl=ttl, prepare=True, **schemas.read_kwargs(table)))
+
+    if not frames:
+        return pd.DataFrame(columns=columns or ['time'])
+    res = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return res.sort_values(by='time')
+
+
+def iter_range(conn, table, timemin, timemax, columns=None, chunk_rows=100_000):
+    # Same rows as read_range, but as a stream of frames: one per local partition, then
+    # chunk_rows at a time from a server-side cursor per gap. Nothing is cached, nothing is sorted.
+    import pyarrow.parquet as pq
+
+    columns = _columns(table, columns)
+    months, gaps = _plan(table, timemin, timemax)
+
+    for month in months:
+        local = pq.read_table(partition_path(table, month), columns=columns, memory_map=True).to_pandas()
+        yield _within(schemas.compact(local, table), timemin, timemax)
+
+    for start, end in gaps:
+        sql, params = _remote_query(table, columns, start, end)
+        yield from conn.stream(sql, params=params, chunk_rows=chunk_rows, **schemas.read_kwargs(table))
+
+
+def has_partitions(table):
+    return bool(partition_months(table))
+
+
+if __name__ == '__main__':
+    from electricity.db import get_engine
+
+    engine = get_engine()
+    for table in sys.argv[1:] or schemas.DATA_TABLES:
+        print(f'{table}: {sync_table(engine, table)} new partitions')
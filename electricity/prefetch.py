@@ -0,0 +1,40 @@
+"""Background warm-up of the panels a viewer has not opened yet.
+
+The pages build and render only the selected ISO and hand the others to a
+``Prefetcher``. Its worker threads call the same cached builders, so switching ISO
+is then served from cache instead of paying for it on first paint.
+"""
+import contextvars
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    def __init__(self, max_workers=2, max_keys=1024):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        # key -> future, remembered so reruns do not queue the same work again
+        self.submitted = OrderedDict()
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+
+    def _call(self, key, fn):
+        try:
+            fn()
+        except Exception:
+            logger.exception('Prefetch of %s failed', key)
+            with self.lock:
+                self.submitted.pop(key, None)
+
+    def submit(self, key, fn):
+        with self.lock:
+            if key in self.submitted:
+                self.submitted.move_to_end(key)
+                return
+            while len(self.submitted) >= self.max_keys:
+                self.submitted.popitem(last=False)
+            # In a copy of the submitting page run's context, so the spans count towards its run
+            self.submitted[key] = self.pool.submit(contextvars.copy_context().run, self._call, key, fn)
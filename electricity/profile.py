@@ -0,0 +1,115 @@
+"""Monthly, weekday and hourly averages derived from one per-range profile.
+
+A profile holds the sum and count of every value column per (year, month, weekday,
+hour). The three EDA views are all roll-ups of it, so a table and date range is
+aggregated once and the three plots share the result.
+
+Long ranges are folded into the profile chunk by chunk (``stream_profile``), so
+memory stays flat no matter how many years are selected. With a ``read_rows`` (the
+pages' ``RangeCache``) the chunks are STREAM_DAYS windows read through it, so long
+ranges are served from, and bounded by, that cache as well.
+"""
+import datetime
+
+import pandas as pd
+
+from electricity import parquet_store
+from electricity.queries import PROFILE_KEYS, VIEWS, read_aggregate, value_columns
+from electricity.rollups import rolled_through, rollup_profile
+from electricity.tracing import span
+
+# Ranges longer than this are streamed instead of read into one frame
+STREAM_DAYS = 366
+
+CHUNK_ROWS = 100_000
+
+
+def profile_from_frame(data, columns):
+    # Timestamps are parsed once and every row is grouped once, with no copy of the frame
+    with span('profile.groupby', rows=len(data)):
+        times = pd.DatetimeIndex(pd.to_datetime(data['time']))
+        # bucketed in UTC like the SQL FIELDS; naive times are taken to be UTC already
+        if times.tz is not None:
+            times = times.tz_convert('UTC')
+        keys = [pd.Series(getattr(times, key), index=data.index, name=key) for key in PROFILE_KEYS]
+        grouped = data[columns].groupby(keys)
+        # values may be float32; the per-group sums are small, the totals across groups are not
+        return pd.concat({'sum': grouped.sum().astype('float64'), 'count': grouped.count()}, axis=1)
+
+
+def add_profiles(total, part):
+    return part if total is None else total.add(part, fill_value=0)
+
+
+def iter_windows(read_rows, table, timemin, timemax, days=STREAM_DAYS):
+    # read_rows over consecutive windows of at most `days`; the last one runs to timemax
+    start = timemin
+    while True:
+        end = start + datetime.timedelta(days=days)
+        if end >= (timemax or datetime.date.today()):
+            yield read_rows(table, start, timemax)
+            return
+        yield read_rows(table, start, end)
+        start = end
+
+
+def stream_profile(conn, table, timemin, timemax, columns, chunk_rows=CHUNK_ROWS, read_rows=None):
+    # Running sum/count: one Parquet partition or chunk_rows of Postgres rows in memory at a time,
+    # or one window of read_rows
+    if read_rows is None:
+        chunks = parquet_store.iter_range(conn, table, timemin, timemax, columns, chunk_rows)
+    else:
+        chunks = iter_windows(read_rows, table, timemin, timemax)
+    total = None
+    for chunk in chunks:
+        if not chunk.empty:
+            total = add_profiles(total, profile_from_frame(chunk, columns))
+    if total is None:
+        return profile_from_frame(pd.DataFrame(columns=['time'] + list(columns)), columns)
+    return total.sort_index()
+
+
+def is_long_range(timemin, timemax):
+    return (timemax or datetime.date.today()) - timemin > datetime.timedelta(days=STREAM_DAYS)
+
+
+def load_profile(conn, table, timemin, timemax, read_rows=None):
+    # Cheapest source first: the rollups, then the local Parquet copy, then a Postgres aggregate.
+    # read_rows(table, timemin, timemax) replaces the plain Parquet read, e.g. with a RangeCache;
+    # ranges longer than STREAM_DAYS are streamed rather than read, through read_rows if given.
+    with span('profile.load', table=table) as trace:
+        if rolled_through(conn, table) is not None:
+            trace['tier'] = 'rollups'
+            return rollup_profile(conn, table, timemin, timemax)
+        if parquet_store.has_partitions(table):
+            columns = value_columns(conn, table)
+            if is_long_range(timemin, timemax):
+                trace['tier'] = 'parquet stream'
+                return stream_profile(conn, table, timemin, timemax, columns, read_rows=read_rows)
+            trace['tier'] = 'parquet'
+            if read_rows is None:
+                rows = parquet_store.read_range(conn, table, timemin, timemax, columns)
+            else:
+                rows = read_rows(table, timemin, timemax)
+            return profile_from_frame(rows, columns)
+        trace['tier'] = 'postgres'
+        return read_aggregate(conn, table, PROFILE_KEYS, timemin, timemax)
+
+
+def view_aggregate(profile, view):
+    # -> sum/count per (year, month|weekday|hour)
+    return profile.groupby(level=['year', VIEWS[view]]).sum()
+
+
+def averages(aggregate):
+    # -> (per-year averages with columns (column, year), overall averages with columns column),
+    #    the same frames the plot functions used to get from groupby().mean()
+    per_year = (aggregate['sum'] / aggregate['count']).unstack(level=0)
+    overall = aggregate.groupby(level=1).sum()
+    overall = overall['sum'] / overall['count']
+    return per_year, overall
+
+
+def view_averages(profile, view):
+    with span('profile.view', view=view, rows=len(profile)):
+        return averages(view_aggregate(profile, view))
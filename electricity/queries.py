@@ -0,0 +1,91 @@
+"""SQL builders that push the EDA aggregations down into Postgres.
+
+Instead of shipping every 5-minute row to pandas and grouping there, Postgres returns
+one row per group (e.g. per (year, month|weekday|hour)) holding the sum and count of
+every value column, and the averages are finished client-side from those.
+"""
+import pandas as pd
+
+from electricity import schemas
+
+# plot -> time field averaged over (alongside the year)
+VIEWS = {'monthly': 'month', 'weekly': 'weekday', 'daily': 'hour'}
+
+# Finest grouping the EDA plots need; every view is a roll-up of this one
+PROFILE_KEYS = ['year', 'month', 'weekday', 'hour']
+
+# Same numbering as pandas' DatetimeIndex.year/.month/.weekday/.hour. Buckets (and the
+# date bounds below) are in UTC whatever the session time zone, as in profile_from_frame
+# and the Parquet partitions, so every tier puts a row in the same bucket.
+FIELDS = {
+    'year': "extract(year from time AT TIME ZONE 'UTC')::int",
+    'month': "extract(month from time AT TIME ZONE 'UTC')::int",
+    'weekday': "(extract(isodow from time AT TIME ZONE 'UTC')::int - 1)",
+    'hour': "extract(hour from time AT TIME ZONE 'UTC')::int",
+}
+
+VALUE_COLUMNS_QUERY = """
+SELECT column_name FROM information_schema.columns
+WHERE table_name = :table
+  AND column_name <> 'index'
+  AND data_type IN ('double precision', 'real', 'numeric', 'bigint', 'integer', 'smallint')
+ORDER BY ordinal_position;
+"""
+
+
+def utc_day(day):
+    # date -> midnight UTC of that day, bound as an aware datetime so the session time zone
+    # does not move it (a bare date is midnight in the session time zone)
+    bound = pd.Timestamp(day)
+    bound = bound.tz_localize('UTC') if bound.tz is None else bound.tz_convert('UTC')
+    return bound.to_pydatetime()
+
+
+def time_filter(timemin, timemax, column='time'):
+    # [timemin, timemax) in UTC days, either end may be open
+    filters = []
+    params = {}
+    if timemin is not None:
+        filters.append(f"{column} >= :timemin")
+        params['timemin'] = utc_day(timemin)
+    if timemax is not None:
+        filters.append(f"{column} < :timemax")
+        params['timemax'] = utc_day(timemax)
+    return ' AND '.join(filters) or 'TRUE', params
+
+
+def aggregate_query(table, columns, keys, timemin, timemax):
+    # -> (sql, params) for sum/count of every column per combination of keys
+    where, params = time_filter(timemin, timemax)
+    groups = ', '.join(f'{FIELDS[key]} AS {key}' for key in keys)
+    selects = ', '.join(f'sum({column}) AS "sum/{column}", count({column}) AS "count/{column}"' for column in columns)
+    positions = ', '.join(str(i) for i in range(1, len(keys) + 1))
+    sql = f"""
+        SELECT {groups}, {selects}
+        FROM {schemas.checked_table(table)}
+        WHERE {where}
+        GROUP BY {positions}
+        ORDER BY {positions};
+    """
+    return sql, params
+
+
+def split_stat_columns(res, index):
+    # "sum/load", "count/load" result columns -> index, columns (sum|count, column)
+    res = res.set_index(index)
+    res.columns = pd.MultiIndex.from_tuples([tuple(c.split('/', 1)) for c in res.columns])
+    return res
+
+
+def value_columns(conn, table):
+    # Declared schema first, the catalog for anything undeclared
+    if schemas.value_columns(table) is not None:
+        return schemas.value_columns(table)
+    return conn.query(VALUE_COLUMNS_QUERY, params={'table': table}, ttl="1d")['column_name'].tolist()
+
+
+def read_aggregate(conn, table, keys, timemin, timemax, columns=None):
+    if columns is None:
+        columns = value_columns(conn, table)
+    sql, params = aggregate_query(table, columns, keys, timemin, timemax)
+    return split_stat_columns(conn.query(sql, params=params, ttl="10m", prepare=True), keys)
@@ -0,0 +1,117 @@
+"""Interval cache for raw table rows, so overlapping date ranges share one copy.
+
+Per table the cache keeps a single time-sorted frame and the list of spans it covers.
+A request only fetches the gaps between resident spans, then slices its rows out of
+the merged frame. Once the cache grows past its byte budget the least recently used
+spans are dropped. Rows from the current (still open) day are never cached.
+
+The loader runs outside the cache lock, so a slow read of one table does not hold up
+requests for the others; requests for the same table wait for each other's reads
+rather than fetching the same gap twice.
+"""
+import datetime
+import threading
+import time
+
+import pandas as pd
+
+from electricity import schemas
+from electricity.parquet_store import time_bound
+from electricity.tracing import frame_bytes, span
+
+
+class RangeCache:
+    def __init__(self, loader, max_bytes):
+        # loader(table, start, end) -> rows of [start, end) sorted by time
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.frames = {}
+        self.spans = {}
+        # guards frames and spans; table_locks serialize the loader calls per table
+        self.lock = threading.Lock()
+        self.table_locks = {}
+
+    def _gaps(self, table, start, end):
+        gaps = []
+        cursor = start
+        for span_start, span_end, _ in sorted(self.spans.get(table, [])):
+            if span_end <= cursor:
+                continue
+            if span_start >= end:
+                break
+            if span_start > cursor:
+                gaps.append((cursor, span_start))
+            cursor = max(cursor, span_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def _slice(self, frame, start, end):
+        if frame.empty:
+            return frame
+        times = frame['time']
+        lo = times.searchsorted(time_bound(start, times), side='left')
+        hi = times.searchsorted(time_bound(end, times), side='left')
+        return frame.iloc[lo:hi]
+
+    def _touch(self, table, start, end):
+        now = time.monotonic()
+        self.spans[table] = [[s, e, now if s < end and e > start else used] for s, e, used in self.spans[table]]
+
+    def resident_bytes(self):
+        return sum(int(frame.memory_usage(index=True).sum()) for frame in self.frames.values())
+
+    def _evict(self):
+        while self.resident_bytes() > self.max_bytes:
+            candidates = [(used, table, s, e) for table, spans in self.spans.items() for s, e, used in spans]
+            if not candidates:
+                return
+            _, table, start, end = min(candidates)
+            if table in self.frames:
+                frame = self.frames[table]
+                times = frame['time']
+                keep = (times < time_bound(start, times)) | (times >= time_bound(end, times))
+                self.frames[table] = frame[keep].reset_index(drop=True)
+            self.spans[table] = [span for span in self.spans[table] if (span[0], span[1]) != (start, end)]
+
+    def _table_lock(self, table):
+        with self.lock:
+            return self.table_locks.setdefault(table, threading.Lock())
+
+    def _merge(self, table, gaps, fetched):
+        fetched = [res for res in fetched if not res.empty]
+        if fetched:
+            frames = [self.frames[table]] if table in self.frames else []
+            with span('range_cache.merge', table=table) as merge:
+                self.frames[table] = pd.concat(frames + fetched, ignore_index=True).sort_values(by='time', ignore_index=True)
+                merge.update(rows=len(self.frames[table]), bytes=frame_bytes(self.frames[table]))
+        self.spans[table].extend([start, end, 0] for start, end in gaps)
+
+    def get(self, table, timemin, timemax):
+        today = datetime.date.today()
+        cached_end = today if timemax is None else min(timemax, today)
+
+        res = schemas.empty_frame(table)
+        if timemin < cached_end:
+            with self._table_lock(table), span('range_cache.get', table=table) as trace:
+                trace['cache'] = 'hit'
+                while True:
+                    with self.lock:
+                        gaps = self._gaps(table, timemin, cached_end)
+                        if not gaps:
+                            self._touch(table, timemin, cached_end)
+                            res = self._slice(self.frames.get(table, res), timemin, cached_end)
+                            self._evict()
+                            break
+                    trace['cache'] = 'miss'
+                    fetched = [self.loader(table, start, end) for start, end in gaps]
+                    with self.lock:
+                        self.spans.setdefault(table, [])
+                        self._merge(table, gaps, fetched)
+                    # another table's eviction may have dropped part of the range meanwhile: go round again
+                trace['rows'] = len(res)
+
+        if timemax is None or timemax > today:
+            live = self.loader(table, max(timemin, today), timemax)
+            res = live if res.empty else pd.concat([res, live], ignore_index=True)
+        return res
@@ -0,0 +1,32 @@
+"""Chart specs for the realtime dashboard: one operating day of a table plus its forecast."""
+import datetime
+
+from electricity import schemas
+from electricity.charts import Chart
+from electricity.isos import split_table
+from electricity.tracing import span
+
+
+def day_chart(table, day, data, forecast):
+    # data: the day's rows of table; forecast: the ISO's forecast_dayof rows (used for load)
+    with span('chart.build', table=table, rows=len(data)):
+        return _day_chart(table, day, data, forecast)
+
+
+def _day_chart(table, day, data, forecast):
+    iso, kind = split_table(table)
+    start_time = datetime.datetime.combine(day, datetime.time(0, 0))
+    end_time = datetime.datetime.combine(day, datetime.time(23, 59))
+
+    if kind == 'load':
+        chart = Chart(f'Realtime {iso.region} Load Data', 'Hour of Day', 'Load (MW)',
+                      xlim=(start_time, end_time), ylim_bottom=0, legend_title='Load', time_axis=True, figsize=(18, 12))
+        chart.line(data['time'], data['load'], color='blue', linewidth=3, label='Real Load')
+        chart.line(forecast['ds'], forecast['yhat'], dashed=True, label='Forecasted load')
+        chart.band(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'], alpha=0.2)
+    else:
+        chart = Chart(f'Realtime {iso.region} Fuel Mix', 'Hour of Day', 'Total Energy Generation (MW)',
+                      xlim=(start_time, end_time), legend_title='Energy Sources', time_axis=True, figsize=(18, 12))
+        y = data[schemas.value_columns(table)].clip(lower=0).fillna(0)
+        chart.stacked_area(data['time'], y.T, labels=y.columns)
+    return chart
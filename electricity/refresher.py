@@ -0,0 +1,89 @@
+"""One background refresh loop per server process for the realtime dashboard.
+
+Instead of every connected session sleeping and re-querying on its own, a single
+daemon thread polls the ISO tables once per interval and publishes the result as a
+versioned snapshot. Sessions only compare version numbers and rerun when it changes,
+so database load stays flat no matter how many viewers are connected.
+
+``wake()`` refreshes ahead of the interval, e.g. from a ``NotifyListener`` when new
+rows land; the interval then only serves as a fallback poll.
+"""
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def gather(calls, max_workers=None):
+    # {name: zero-argument callable} -> {name: result}, all calls in flight at once so the
+    # wall time is that of the slowest one rather than the sum. Each call runs in a copy of
+    # the caller's context, so its spans land in the caller's tracing run
+    with ThreadPoolExecutor(max_workers=max_workers or len(calls) or 1, thread_name_prefix='gather') as pool:
+        futures = {name: pool.submit(contextvars.copy_context().run, call) for name, call in calls.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+class SnapshotRefresher:
+    def __init__(self, fetch, interval, signature=None, settle=2):
+        # fetch() -> snapshot; signature(snapshot) -> hashable summary used to decide
+        # whether anything actually changed (defaults to always publishing).
+        # settle: seconds to wait after a wake-up so a burst of inserts is fetched once
+        self.fetch = fetch
+        self.interval = interval
+        self.signature = signature
+        self.settle = settle
+        self.version = 0
+        self.snapshot = None
+        self.refreshed_at = None
+        self._last_signature = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def _refresh(self):
+        snapshot = self.fetch()
+        signature = self.signature(snapshot) if self.signature is not None else object()
+        with self._lock:
+            self.refreshed_at = time.time()
+            if self.snapshot is None or signature != self._last_signature:
+                self.snapshot = snapshot
+                self._last_signature = signature
+                self.version += 1
+        return self.version
+
+    def refresh(self):
+        with self._refresh_lock:
+            return self._refresh()
+
+    def latest(self):
+        # -> (version, snapshot); loads the first snapshot synchronously if the thread has not yet
+        if self.snapshot is None:
+            with self._refresh_lock:
+                if self.snapshot is None:
+                    self._refresh()
+        with self._lock:
+            return self.version, self.snapshot
+
+    def wake(self, *args):
+        # Accepts and ignores callback arguments (e.g. the notified tables)
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            if self._wake.wait(self.interval):
+                time.sleep(self.settle)
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('Snapshot refresh failed, keeping version %s', self.version)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='snapshot-refresher', daemon=True)
+            self._thread.start()
+        return self
@@ -0,0 +1,132 @@
+"""Out-of-process rendering of server-side (matplotlib) charts.
+
+A ``Chart`` spec is rasterized in a pool of worker processes, so concurrent sessions
+render on as many cores as there are workers instead of queueing on the GIL of the
+Streamlit server. Numeric series arrays are copied once into a shared memory block
+and the workers read them from there; only the layout and the small non-numeric
+values (labels, colors by name) are pickled. Workers draw with the object-oriented
+Figure API and return PNG or SVG bytes.
+
+Requests are keyed by the chart's content digest and format: a chart that is
+already being rendered is not submitted again, the second caller waits for the
+same result. ``RENDER_WORKERS`` sets the pool size (default: one per core, 0 renders
+in the calling thread instead).
+"""
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', os.cpu_count() or 1))
+
+# Where a series array sits in the shared memory block
+SharedArray = namedtuple('SharedArray', ['offset', 'dtype', 'shape'])
+
+ALIGNMENT = 64
+
+
+def _shareable(value):
+    return isinstance(value, np.ndarray) and value.dtype != object
+
+
+def pack(chart):
+    # -> (shared memory block, layout, series with SharedArray in place of numeric arrays)
+    arrays = [value for series in chart.series for value in series.values() if _shareable(value)]
+    size = sum(-(-value.nbytes // ALIGNMENT) * ALIGNMENT for value in arrays)
+    shm = SharedMemory(create=True, size=max(size, 1))
+    offset = 0
+    packed = []
+    for series in chart.series:
+        entry = {}
+        for name, value in series.items():
+            if _shareable(value):
+                np.ndarray(value.shape, value.dtype, buffer=shm.buf, offset=offset)[...] = value
+                entry[name] = SharedArray(offset, value.dtype.str, value.shape)
+                offset += -(-value.nbytes // ALIGNMENT) * ALIGNMENT
+            else:
+                entry[name] = value
+        packed.append(entry)
+    layout = {name: value for name, value in vars(chart).items() if name != 'series'}
+    return shm, layout, packed
+
+
+def _warm_up():
+    # Pay for the matplotlib import when the worker starts, not on the first chart
+    import matplotlib.figure  # noqa: F401
+
+
+def _render(layout, packed, shm_name, fmt):
+    from electricity.charts import Chart, render_matplotlib
+    from electricity.figcache import figure_to_bytes
+
+    shm = SharedMemory(name=shm_name)
+    try:
+        # copies, so the block can be closed while the figure still holds the data
+        series = [{name: np.ndarray(value.shape, np.dtype(value.dtype), buffer=shm.buf, offset=value.offset).copy()
+                   if isinstance(value, SharedArray) else value for name, value in entry.items()}
+                  for entry in packed]
+    finally:
+        shm.close()
+    chart = Chart.__new__(Chart)
+    vars(chart).update(layout, series=series)
+    return figure_to_bytes(render_matplotlib(chart), fmt)
+
+
+class RenderPool:
+    def __init__(self, max_workers):
+        # spawn: forking a threaded Streamlit server is not safe
+        self.pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_warm_up)
+        # (digest, format) -> future of the render in flight
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def _done(self, key, shm):
+        shm.close()
+        shm.unlink()
+        with self.lock:
+            self.pending.pop(key, None)
+
+    def submit(self, chart, fmt='png'):
+        key = (chart.digest(), fmt)
+        with self.lock:
+            future = self.pending.get(key)
+            if future is not None:
+                return future
+            shm, layout, packed = pack(chart)
+            try:
+                future = self.pool.submit(_render, layout, packed, shm.name, fmt)
+            except Exception:
+                shm.close()
+                shm.unlink()
+                raise
+            self.pending[key] = future
+        # outside the lock: the callback runs right away if the render already finished
+        future.add_done_callback(lambda _: self._done(key, shm))
+        return future
+
+    def render(self, chart, fmt='png'):
+        return self.submit(chart, fmt).result()
+
+    def stats(self):
+        with self.lock:
+            return {'workers': self.pool._max_workers, 'in_flight': len(self.pending)}
+
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def render_pool():
+    # One pool per server process, or None when RENDER_WORKERS is 0
+    global _render_pool
+    if RENDER_WORKERS <= 0:
+        return None
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = RenderPool(RENDER_WORKERS)
+        return _render_pool
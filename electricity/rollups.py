@@ -0,0 +1,197 @@
+"""Pre-aggregated sum/count rollups backing the EDA monthly, weekday and hourly plots.
+
+Every closed month of an ISO table is folded into ``eda_rollup`` as one row per
+(table, column, year, month, weekday, hour) holding the sum and count of that
+column. Averages over any date range are then rebuilt from a few thousand
+rollup rows plus a raw aggregate over the partial months at either end.
+
+Refresh the rollups after new data lands with::
+
+    python -m electricity.rollups [table ...]
+"""
+import datetime
+import sys
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from electricity import schemas
+from electricity.queries import FIELDS, PROFILE_KEYS, VALUE_COLUMNS_QUERY, read_aggregate, time_filter
+
+ROLLUP_TABLE = 'eda_rollup'
+ROLLUP_STATE_TABLE = 'eda_rollup_state'
+
+ROLLUP_SOURCE_TABLES = schemas.DATA_TABLES
+
+CREATE_ROLLUP_TABLES = f"""
+CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+    table_name text NOT NULL,
+    column_name text NOT NULL,
+    year smallint NOT NULL,
+    month smallint NOT NULL,
+    weekday smallint NOT NULL,
+    hour smallint NOT NULL,
+    total double precision NOT NULL,
+    n bigint NOT NULL,
+    PRIMARY KEY (table_name, column_name, year, month, weekday, hour)
+);
+CREATE TABLE IF NOT EXISTS {ROLLUP_STATE_TABLE} (
+    table_name text PRIMARY KEY,
+    rolled_through date NOT NULL
+);
+"""
+
+def month_floor(day):
+    return datetime.date(day.year, day.month, 1)
+
+
+def month_ceil(day):
+    start = month_floor(day)
+    if start == day:
+        return start
+    return month_floor(start + datetime.timedelta(days=31))
+
+
+### Writing rollups
+
+def value_columns(conn, table):
+    if schemas.value_columns(table) is not None:
+        return schemas.value_columns(table)
+    return [row[0] for row in conn.execute(text(VALUE_COLUMNS_QUERY), {'table': table})]
+
+
+def _fold(conn, table, columns, start, end):
+    # Roll up the rows of [start, end) into eda_rollup; start None is from the first row
+    where, params = time_filter(start, end)
+    unpivot = ', '.join(f"('{column}', {column}::double precision)" for column in columns)
+    conn.execute(text(f"""
+        INSERT INTO {ROLLUP_TABLE} (table_name, column_name, year, month, weekday, hour, total, n)
+        SELECT :table, v.column_name, {FIELDS['year']}, {FIELDS['month']}, {FIELDS['weekday']}, {FIELDS['hour']},
+               sum(v.value), count(v.value)
+        FROM {schemas.checked_table(table)} CROSS JOIN LATERAL (VALUES {unpivot}) AS v(column_name, value)
+        WHERE {where}
+        GROUP BY 1, 2, 3, 4, 5, 6
+        HAVING count(v.value) > 0;
+    """), {'table': table, **params})
+
+
+def refresh_rollup(conn, table, rebuild=False):
+    # Fold every closed month not yet rolled up into eda_rollup. The current month
+    # keeps changing, so it is always answered from the raw table instead.
+    conn.execute(text(CREATE_ROLLUP_TABLES))
+    columns = value_columns(conn, table)
+    through = month_floor(datetime.date.today())
+
+    start = None
+    if not rebuild:
+        start = conn.execute(text(f"SELECT rolled_through FROM {ROLLUP_STATE_TABLE} WHERE table_name = :table;"),
+                             {'table': table}).scalar()
+    if start is not None and start >= through:
+        return
+
+    if start is None:
+        conn.execute(text(f"DELETE FROM {ROLLUP_TABLE} WHERE table_name = :table;"), {'table': table})
+    else:
+        conn.execute(text(f"DELETE FROM {ROLLUP_TABLE} WHERE table_name = :table AND make_date(year, month, 1) >= :start;"),
+                     {'table': table, 'start': start})
+    _fold(conn, table, columns, start, through)
+
+    conn.execute(text(f"""
+        INSERT INTO {ROLLUP_STATE_TABLE} (table_name, rolled_through) VALUES (:table, :through)
+        ON CONFLICT (table_name) DO UPDATE SET rolled_through = EXCLUDED.rolled_through;
+    """), {'table': table, 'through': through})
+
+
+def refresh_months(conn, table, start, end):
+    # After rows of [start, end) were rewritten (a backfill): re-fold only the rolled-up
+    # months they touch, then fold any month closed since the last refresh
+    conn.execute(text(CREATE_ROLLUP_TABLES))
+    through = conn.execute(text(f"SELECT rolled_through FROM {ROLLUP_STATE_TABLE} WHERE table_name = :table;"),
+                           {'table': table}).scalar()
+    first = month_floor(start)
+    last = min(month_ceil(end), through) if through is not None else first
+    if first < last:
+        conn.execute(text(f"""
+            DELETE FROM {ROLLUP_TABLE}
+            WHERE table_name = :table AND make_date(year, month, 1) >= :first AND make_date(year, month, 1) < :last;
+        """), {'table': table, 'first': first, 'last': last})
+        _fold(conn, table, value_columns(conn, table), first, last)
+    refresh_rollup(conn, table)
+
+
+### Reading rollups
+
+def _wide(rows):
+    # long (year, month, weekday, hour, column_name, total, n) rows
+    # -> index (year, month, weekday, hour), columns (sum|count, column)
+    if rows.empty:
+        return pd.DataFrame(index=pd.MultiIndex.from_arrays([[]] * len(PROFILE_KEYS), names=PROFILE_KEYS))
+    wide = rows.pivot_table(index=PROFILE_KEYS, columns='column_name', values=['total', 'n'], aggfunc='sum')
+    return wide.rename(columns={'total': 'sum', 'n': 'count'}, level=0)
+
+
+def state_table_exists(conn):
+    # Before migration 3 or the first refresh there is no state table; to_regclass is NULL
+    # then instead of an error. Other engines (e.g. a SQLite stand-in) ask the inspector.
+    if conn.engine.dialect.name != 'postgresql':
+        return inspect(conn.engine).has_table(ROLLUP_STATE_TABLE)
+    res = conn.query("SELECT to_regclass(:name) IS NOT NULL AS present;",
+                     params={'name': ROLLUP_STATE_TABLE}, ttl="10m", prepare=True)
+    return bool(res['present'].iloc[0])
+
+
+def rolled_through(conn, table):
+    if not state_table_exists(conn):
+        return None
+    res = conn.query(f"SELECT rolled_through FROM {ROLLUP_STATE_TABLE} WHERE table_name = :table;",
+                     params={'table': table}, ttl="10m", prepare=True)
+    if res.empty:
+        return None
+    return pd.to_datetime(res['rolled_through'].iloc[0]).date()
+
+
+def rollup_profile(conn, table, timemin, timemax):
+    # Sum/count per (year, month, weekday, hour) over [timemin, timemax): whole rolled-up
+    # months come from eda_rollup, the partial months at either end from the raw table.
+    # Only valid once refresh_rollup has run for the table (rolled_through is not None).
+    through = rolled_through(conn, table)
+    first = month_ceil(timemin)
+    last = month_floor(timemax) if timemax is not None else through
+    last = min(last, through)
+
+    rollup = conn.query(f"""
+        SELECT year, month, weekday, hour, column_name, total, n
+        FROM {ROLLUP_TABLE}
+        WHERE table_name = :table AND make_date(year, month, 1) >= :first AND make_date(year, month, 1) < :last;
+    """, params={'table': table, 'first': first, 'last': last}, ttl="10m", prepare=True)
+    parts = [_wide(rollup)]
+    # the declared columns, not just those with rollup rows
+    columns = schemas.value_columns(table) or sorted(rollup['column_name'].unique()) or None
+
+    if first >= last:
+        parts = [read_aggregate(conn, table, PROFILE_KEYS, timemin, timemax, columns)]
+    else:
+        if timemin < first:
+            parts.append(read_aggregate(conn, table, PROFILE_KEYS, timemin, first, columns))
+        if timemax is None or last < timemax:
+            parts.append(read_aggregate(conn, table, PROFILE_KEYS, last, timemax, columns))
+
+    profile = pd.concat(parts).groupby(level=PROFILE_KEYS).sum()
+    if columns is None:
+        return profile
+    # A column that is NULL over every rolled-up month has no rollup rows (e.g. NYISO's
+    # dual_fuel); keep it in the profile as sum NaN, count 0
+    for column in columns:
+        if ('count', column) not in profile.columns:
+            profile[('sum', column)] = float('nan')
+            profile[('count', column)] = 0
+    return profile.reindex(columns=pd.MultiIndex.from_product([['sum', 'count'], columns]))
+
+
+if __name__ == '__main__':
+    from electricity.db import get_engine
+
+    with get_engine().begin() as conn:
+        for table in sys.argv[1:] or ROLLUP_SOURCE_TABLES:
+            refresh_rollup(conn, table)
+            print(f'{table}: rolled up through {month_floor(datetime.date.today())}')
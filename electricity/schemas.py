@@ -0,0 +1,93 @@
+"""Declared columns and dtypes of the ISO tables.
+
+Reads select only the declared columns (no ``index``, no CAISO ``interval_start`` /
+``interval_end``), parse the time column while reading, and keep MW values as
+float32, which halves a multi-year fuel-mix frame before any work is done on it.
+
+Only tables listed here may be interpolated into SQL (``checked_table``); values
+such as time ranges always go in as bind parameters.
+"""
+import pandas as pd
+
+from electricity.isos import ISOS
+
+FUEL_SOURCES = {key: iso.fuel_sources for key, iso in ISOS.items()}
+
+FORECAST_COLUMNS = ['yhat', 'yhat_lower', 'yhat_upper']
+
+DATA_TABLES = [table for iso in ISOS.values() for table in (iso.load_table, iso.fuel_mix_table)]
+
+FORECAST_TABLES = [iso.forecast_table for iso in ISOS.values()]
+
+VALUE_DTYPE = 'float32'
+
+
+def current_day_view(table):
+    return f'{table}_current_day'
+
+
+TABLES = frozenset(DATA_TABLES + FORECAST_TABLES + [current_day_view(table) for table in DATA_TABLES])
+
+
+def checked_table(table):
+    if table not in TABLES:
+        raise ValueError(f'Unknown table: {table!r}')
+    return table
+
+
+def time_column(table):
+    return 'ds' if table.startswith('forecast_') else 'time'
+
+
+def value_columns(table):
+    # None for tables without a declared schema
+    if table.startswith('forecast_'):
+        return FORECAST_COLUMNS
+    iso, _, kind = table.partition('_')
+    if kind == 'load':
+        return ['load']
+    if kind == 'fuel_mix' and iso in FUEL_SOURCES:
+        return FUEL_SOURCES[iso]
+    return None
+
+
+def columns(table):
+    values = value_columns(table)
+    return None if values is None else [time_column(table)] + values
+
+
+def select_list(table):
+    return ', '.join(columns(table) or ['*'])
+
+
+def read_kwargs(table):
+    # Extra pd.read_sql arguments (also accepted by st.connection(...).query)
+    values = value_columns(table)
+    kwargs = {'parse_dates': [time_column(table)]}
+    if values is not None:
+        kwargs['dtype'] = {column: VALUE_DTYPE for column in values}
+    return kwargs
+
+
+def empty_frame(table):
+    # No rows, but the dtypes a read of the table would have
+    time = time_column(table)
+    frame = pd.DataFrame({time: pd.Series(dtype='datetime64[ns, UTC]')})
+    for column in value_columns(table) or []:
+        frame[column] = pd.Series(dtype=VALUE_DTYPE)
+    return frame
+
+
+def compact(frame, table):
+    # Project and downcast a frame that did not come through read_kwargs (e.g. old Parquet files)
+    cols = columns(table)
+    if cols is not None:
+        frame = frame[[column for column in cols if column in frame.columns]]
+    time = time_column(table)
+    if time in frame.columns and not pd.api.types.is_datetime64_any_dtype(frame[time]):
+        frame = frame.assign(**{time: pd.to_datetime(frame[time])})
+    values = [column for column in value_columns(table) or [] if column in frame.columns]
+    stale = [column for column in values if frame[column].dtype != VALUE_DTYPE]
+    if stale:
+        frame = frame.astype({column: VALUE_DTYPE for column in stale})
+    return frame
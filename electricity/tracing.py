@@ -0,0 +1,111 @@
+"""Lightweight tracing of the hot paths: timers, row counts, bytes and cache hits.
+
+Code wraps a stage in ``with span('db.query') as s:`` and may set ``s['rows']``,
+``s['bytes']`` or ``s['cache']`` ('hit' / 'miss') inside it. Every span feeds the
+process-wide totals behind ``prometheus_text()``. Spans in the context of a page run
+that called ``start_run()`` are also kept for that run, which
+``performance_panel()`` shows in the sidebar; ``gather`` and the ``Prefetcher`` run
+their work in a copy of the caller's context, so their spans count too. With ``TRACE_LOG=json`` each span is
+also logged as one JSON line.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+TRACE_LOG = os.environ.get('TRACE_LOG', '')
+
+_run = contextvars.ContextVar('tracing_run', default=None)
+_totals = {}
+_totals_lock = threading.Lock()
+
+
+def start_run():
+    # Spans from this context go to a fresh list until the next start_run()
+    spans = []
+    _run.set(spans)
+    return spans
+
+
+def run_spans():
+    return _run.get() or []
+
+
+def frame_bytes(frame):
+    return int(frame.memory_usage(index=True).sum())
+
+
+def _record(record):
+    with _totals_lock:
+        totals = _totals.setdefault(record['stage'], {'count': 0, 'seconds': 0.0, 'rows': 0, 'bytes': 0, 'hits': 0, 'misses': 0})
+        totals['count'] += 1
+        totals['seconds'] += record['seconds']
+        totals['rows'] += record.get('rows') or 0
+        totals['bytes'] += record.get('bytes') or 0
+        if record.get('cache') == 'hit':
+            totals['hits'] += 1
+        elif record.get('cache') == 'miss':
+            totals['misses'] += 1
+    spans = _run.get()
+    if spans is not None:
+        spans.append(record)
+    if TRACE_LOG == 'json':
+        logger.info(json.dumps(record, default=str))
+
+
+@contextmanager
+def span(stage, **attrs):
+    record = {'stage': stage, **attrs}
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - started
+        _record(record)
+
+
+def totals():
+    with _totals_lock:
+        return {stage: dict(values) for stage, values in _totals.items()}
+
+
+def prometheus_text():
+    # Prometheus text exposition format, one series per stage
+    metrics = [
+        ('electricity_stage_calls_total', 'counter', 'Calls per stage', 'count'),
+        ('electricity_stage_seconds_total', 'counter', 'Seconds spent per stage', 'seconds'),
+        ('electricity_stage_rows_total', 'counter', 'Rows handled per stage', 'rows'),
+        ('electricity_stage_bytes_total', 'counter', 'Bytes handled per stage', 'bytes'),
+        ('electricity_stage_cache_hits_total', 'counter', 'Cache hits per stage', 'hits'),
+        ('electricity_stage_cache_misses_total', 'counter', 'Cache misses per stage', 'misses'),
+    ]
+    current = totals()
+    lines = []
+    for name, kind, help_text, key in metrics:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        lines += [f'{name}{{stage="{stage}"}} {values[key]}' for stage, values in sorted(current.items())]
+    return '\n'.join(lines) + '\n'
+
+
+def performance_panel(container, extra=None):
+    # container: e.g. st.sidebar; extra: {title: dict} of other stats to show (pool, figure cache)
+    import pandas as pd
+
+    spans = run_spans()
+    container.subheader('Performance')
+    if spans:
+        frame = pd.DataFrame(spans)
+        frame['ms'] = (frame.pop('seconds') * 1000).round(1)
+        container.caption(f'{len(spans)} spans, {frame["ms"].sum():.0f} ms traced this run')
+        container.dataframe(frame, hide_index=True, use_container_width=True)
+    else:
+        container.caption('Nothing traced this run.')
+    for title, stats in {'Process totals': totals(), **(extra or {})}.items():
+        container.expander(title).json(stats)
+    container.download_button('Prometheus metrics', prometheus_text(), file_name='metrics.txt')
+    container.download_button('Run spans (JSON)', json.dumps(spans, default=str), file_name='spans.json')
@@ -1,448 +1,111 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
-import warnings
-import plotly.express as px
-import gridstatus
 import datetime
-import time
-import psycopg2
-
-warnings.filterwarnings('ignore')
-
-st.set_page_config(
-    layout="wide",
-    page_title='Exploratory Data Analysis',
-    page_icon=':chart_with_upwards_trend:',
-)
+from electricity.app import page_setup
+from electricity.db import database
+from electricity.parquet_store import read_range
+from electricity.range_cache import RangeCache
+from electricity.charts import ChartSet, prerender, show_chart
+from electricity.figcache import FIGURE_CACHE
+from electricity.eda import average_chart
+from electricity.isos import ISOS, enabled_isos
+from electricity.prefetch import Prefetcher
+from electricity.queries import VIEWS
+from electricity.profile import load_profile, view_averages
+from electricity.tracing import performance_panel, span, start_run
+
+page_setup(page_title='Exploratory Data Analysis', page_icon=':chart_with_upwards_trend:', layout="wide")
+
+show_performance = st.sidebar.checkbox('Performance panel', key='show_performance')
+start_run()
 
 ### Global Variables and Helper Functions
 
-data_map = {'nyiso_load': 'New York', 
-                'nyiso_fuel_mix': 'New York',
-                'caiso_load': 'California',
-                'caiso_fuel_mix': 'California',
-                'isone_load': 'New England',
-                'isone_fuel_mix': 'New England'}
-
-nyiso_fuel_sources = [
-    'dual_fuel', 'hydro', 'natural_gas', 'nuclear',
-    'other_fossil_fuels', 'other_renewables', 'wind']
+# One column per table kind
+KINDS = ['load', 'fuel_mix']
 
-caiso_fuel_sources = [
-    'solar', 'wind', 'geothermal', 'biomass', 'biogas', 'small_hydro', 'coal', 'nuclear', 'natural_gas', 'large_hydro', 'batteries', 'imports', 'other']
-
-isone_fuel_sources = [
-    'coal', 'hydro', 'landfill_gas', 'natural_gas', 'nuclear', 'oil', 'refuse', 'solar', 'wind', 'wood', 'other']
+@st.cache_resource
+def get_range_cache():
+    # Shared by every session: overlapping date ranges are served from one copy of the rows
+    conn = database()
+    # Closed months come from the local Parquet partitions, the rest from Postgres;
+    # ttl=0 so the query cache does not keep a second copy of the same rows
+    return RangeCache(lambda table, start, end: read_range(conn, table, start, end, ttl=0), max_bytes=512 * 1024 * 1024)
 
-@st.cache_data
 def load_table_based_on_timerange(timemin, timemax, table):
-    
-    conn = st.connection("postgresql", type="sql")
-    if timemax is None:
-        res = conn.query(f"SELECT * FROM {table} WHERE time >= \'{timemin}\';", ttl="10m")
-    else:
-        res = conn.query(f"SELECT * FROM {table} WHERE time >= \'{timemin}\' AND time < \'{timemax}\';", ttl="10m")
-    res = res.sort_values(by='time')
+    res = get_range_cache().get(table, timemin, timemax)
     return res
 
-@st.cache_resource
-def plot_monthly_table_based_on_timerange(timemin, timemax, table):
-    data = load_table_based_on_timerange(timemin, timemax, table)
-
-    if 'load' in table:
-        data_type = 'load'
-    else:
-        data_type = 'fuel_mix'
-
-    data_copy = data.copy()
-
-    data_copy['time'] = pd.to_datetime(data_copy['time'])
-    data_copy.set_index('time', inplace=True)
-
-    data_copy['Year'] = data_copy.index.year
-    data_copy['Month'] = data_copy.index.month
-
-    monthly_avg_per_year = data_copy.groupby(['Year', 'Month']).mean().unstack(level=0)
-    monthly_avg_overall = data_copy.groupby('Month').mean()
-
-    bottoms = [0] * len(monthly_avg_overall)
-
-    fig = plt.figure(figsize=(14, 8))
-
-    
-    if data_type == 'load':
-        for year in data_copy['Year'].unique():
-            monthly = monthly_avg_per_year[data_type][year]
-            plt.plot(monthly.index, monthly, alpha=0.3, label=str(year))
-
-        plt.plot(monthly_avg_overall.index, monthly_avg_overall[data_type], color='blue', linewidth=3, label='Average Load')
-        plt.title(f'Historical {data_map[table]} Load Data - Monthly Averages', fontsize=16)
-        plt.xlabel('Month', fontsize=12)
-        plt.ylabel('Load (MW)', fontsize=12)
-
-        plt.xticks(range(1, 13), ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
-        plt.xlim([1, 12])
-
-        plt.legend(title='Year', loc='upper right', bbox_to_anchor=(1.05, 1))
-        plt.grid(True)
-        plt.tight_layout()
-    elif data_type == 'fuel_mix':
-        if 'nyiso' in table:
-            for fuel_source in nyiso_fuel_sources:
-                plt.bar(monthly_avg_overall.index,
-                    monthly_avg_overall[fuel_source],
-                    bottom=bottoms,
-                    label=fuel_source,
-                    color=cm.get_cmap('tab20c', len(nyiso_fuel_sources))(nyiso_fuel_sources.index(fuel_source)),
-                    alpha=0.7)
-                bottoms = [bottom + value for bottom, value in zip(bottoms, monthly_avg_overall[fuel_source])]
-
-            plt.title(f'Historical {data_map[table]} Fuel Mix - Monthly Averages', fontsize=16)
-            plt.xlabel('Month', fontsize=12)
-            plt.ylabel('Total Energy Generation (MW)', fontsize=12)
-
-
-            plt.xticks(range(1, 13), ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
-            plt.xlim([1, 12])
-            plt.legend(title="Energy Sources", bbox_to_anchor=(1.05, 1), loc='upper right')
-
-
-            plt.grid(True)
-            plt.tight_layout()
-        elif 'caiso' in table:
-            for fuel_source in caiso_fuel_sources:
-                plt.bar(monthly_avg_overall.index,
-                    monthly_avg_overall[fuel_source],
-                    bottom=bottoms,
-                    label=fuel_source,
-                    color=cm.get_cmap('tab20c', len(caiso_fuel_sources))(caiso_fuel_sources.index(fuel_source)),
-                    alpha=0.7)
-                bottoms = [bottom + value for bottom, value in zip(bottoms, monthly_avg_overall[fuel_source])]
-
-            plt.title(f'Historical {data_map[table]} Fuel Mix - Monthly Averages', fontsize=16)
-            plt.xlabel('Month', fontsize=12)
-            plt.ylabel('Total Energy Generation (MW)', fontsize=12)
-
-
-            plt.xticks(range(1, 13), ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
-            plt.xlim([1, 12])
-            plt.legend(title="Energy Sources", bbox_to_anchor=(1.05, 1), loc='upper right')
-
-
-            plt.grid(True)
-            plt.tight_layout()
-        elif 'isone' in table:
-            for fuel_source in isone_fuel_sources:
-                plt.bar(monthly_avg_overall.index,
-                    monthly_avg_overall[fuel_source],
-                    bottom=bottoms,
-                    label=fuel_source,
-                    color=cm.get_cmap('tab20c', len(isone_fuel_sources))(isone_fuel_sources.index(fuel_source)),
-                    alpha=0.7)
-                bottoms = [bottom + value for bottom, value in zip(bottoms, monthly_avg_overall[fuel_source])]
-
-            plt.title(f'Historical {data_map[table]} Fuel Mix - Monthly Averages', fontsize=16)
-            plt.xlabel('Month', fontsize=12)
-            plt.ylabel('Total Energy Generation (MW)', fontsize=12)
-
+@st.cache_data(ttl="10m")
+def load_profile_based_on_timerange(timemin, timemax, table):
+    # One aggregate per table and range, shared by the monthly, weekly and daily plots
+    conn = database()
+    return load_profile(conn, table, timemin, timemax, read_rows=lambda table, start, end: load_table_based_on_timerange(start, end, table))
 
-            plt.xticks(range(1, 13), ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
-            plt.xlim([1, 12])
-            plt.legend(title="Energy Sources", bbox_to_anchor=(1.05, 1), loc='upper right')
-
-
-            plt.grid(True)
-            plt.tight_layout()
-    return fig
-
-@st.cache_resource
-def plot_weekly_table_based_on_timerange(timemin, timemax, table):
-    data = load_table_based_on_timerange(timemin, timemax, table)
-
-    if 'load' in table:
-        data_type = 'load'
-    else:
-        data_type = 'fuel_mix'
-
-    data_copy = data.copy()
-
-    data_copy['time'] = pd.to_datetime(data_copy['time'])
-    data_copy.set_index('time', inplace=True)
-
-    data_copy['Year'] = data_copy.index.year
-    data_copy['Weekday'] = data_copy.index.weekday
-
-    weekday_avg_per_year = data_copy.groupby(['Year', 'Weekday']).mean().unstack(level=0)
-    weekday_avg_overall = data_copy.groupby('Weekday').mean()
-
-    bottoms = [0] * len(weekday_avg_overall)
-    
-    fig = plt.figure(figsize=(14, 8))
-
-    if data_type == "load":
-        for year in data_copy['Year'].unique():
-            weekday_data = weekday_avg_per_year[data_type][year]
-            plt.plot(weekday_data.index, weekday_data, alpha=0.3, label=str(year))
-
-        plt.plot(weekday_avg_overall.index, weekday_avg_overall[data_type], color='blue', linewidth=3, label='Average Load')
-        plt.title(f'Historical {data_map[table]} Load Data - Daily Averages by Weekday', fontsize=16)
-        plt.xlabel('Weekday', fontsize=12)
-        plt.ylabel('Load (MW)', fontsize=12)
-        
-        plt.xticks(range(0, 7), ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
-        plt.xlim([0, 6])
-
-        plt.legend(title='Year', loc='upper right', bbox_to_anchor=(1.05, 1))
-        plt.grid(True)
-        plt.tight_layout()
-    elif data_type == "fuel_mix":
-        if 'nyiso' in table:
-            for fuel_source in nyiso_fuel_sources:
-                plt.bar(weekday_avg_overall.index,
-                    weekday_avg_overall[fuel_source],
-                    bottom=bottoms,
-                    label=fuel_source,
-                    color=cm.get_cmap('tab20c', len(nyiso_fuel_sources))(nyiso_fuel_sources.index(fuel_source)),
-                    alpha=0.7)
-                bottoms = [bottom + value for bottom, value in zip(bottoms, weekday_avg_overall[fuel_source])]
-
-            plt.title(f'Historical {data_map[table]} Fuel Mix - Daily Averages by Weekday', fontsize=16)
-            plt.xlabel('Weekday', fontsize=12)
-            plt.ylabel('Total Energy Generation (MW)', fontsize=12)
-
-            plt.xticks(range(0, 7), ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
-            plt.xlim([0, 6])
-            plt.legend(title="Energy Sources", bbox_to_anchor=(1.05, 1), loc='upper right')
-
-            plt.grid(True)
-            plt.tight_layout()
-        elif 'caiso' in table:
-            for fuel_source in caiso_fuel_sources:
-                plt.bar(weekday_avg_overall.index,
-                    weekday_avg_overall[fuel_source],
-                    bottom=bottoms,
-                    label=fuel_source,
-                    color=cm.get_cmap('tab20c', len(caiso_fuel_sources))(caiso_fuel_sources.index(fuel_source)),
-                    alpha=0.7)
-                bottoms = [bottom + value for bottom, value in zip(bottoms, weekday_avg_overall[fuel_source])]
-
-            plt.title(f'Historical {data_map[table]} Fuel Mix - Daily Averages by Weekday', fontsize=16)
-            plt.xlabel('Weekday', fontsize=12)
-            plt.ylabel('Total Energy Generation (MW)', fontsize=12)
-
-            plt.xticks(range(0, 7), ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
-            plt.xlim([0, 6])
-            plt.legend(title="Energy Sources", bbox_to_anchor=(1.05, 1), loc='upper right')
-
-            plt.grid(True)
-            plt.tight_layout()
-        elif 'isone' in table:
-            for fuel_source in isone_fuel_sources:
-                plt.bar(weekday_avg_overall.index,
-                    weekday_avg_overall[fuel_source],
-                    bottom=bottoms,
-                    label=fuel_source,
-                    color=cm.get_cmap('tab20c', len(isone_fuel_sources))(isone_fuel_sources.index(fuel_source)),
-                    alpha=0.7)
-                bottoms = [bottom + value for bottom, value in zip(bottoms, weekday_avg_overall[fuel_source])]
-
-            plt.title(f'Historical {data_map[table]} Fuel Mix - Daily Averages by Weekday', fontsize=16)
-            plt.xlabel('Weekday', fontsize=12)
-            plt.ylabel('Total Energy Generation (MW)', fontsize=12)
-
-            plt.xticks(range(0, 7), ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
-            plt.xlim([0, 6])
-            plt.legend(title="Energy Sources", bbox_to_anchor=(1.05, 1), loc='upper right')
-
-            plt.grid(True)
-            plt.tight_layout()        
-    return fig
+@st.cache_resource(max_entries=192, ttl="1h")
+def plot_table_based_on_timerange(timemin, timemax, table, view):
+    # view: 'monthly', 'weekly' or 'daily'; the ISO registry supplies labels, fuel sources and colors
+    with span('plot_table_based_on_timerange', table=table, view=view):
+        per_year, overall = view_averages(load_profile_based_on_timerange(timemin, timemax, table), view)
+        return average_chart(table, view, per_year, overall)
 
 @st.cache_resource
-def plot_daily_table_based_on_timerange(timemin, timemax, table):
-    data = load_table_based_on_timerange(timemin, timemax, table)
-    
-    if 'load' in table:
-        data_type = 'load'
-    else:
-        data_type = 'fuel_mix'
-
-    data_copy = data.copy()
-
-    data_copy['time'] = pd.to_datetime(data_copy['time'])
-    data_copy.set_index('time', inplace=True)
-
-    data_copy['Year'] = data_copy.index.year
-    data_copy['Hour'] = data_copy.index.hour
-
-    hourly_avg_per_year = data_copy.groupby(['Year', 'Hour']).mean().unstack(level=0)
-    hourly_avg_overall = data_copy.groupby('Hour').mean()
-
-    bottoms = [0] * len(hourly_avg_overall)
-
-    fig = plt.figure(figsize=(14, 8))
-    if data_type == "load":
-        for year in data_copy['Year'].unique():
-            hourly_data = hourly_avg_per_year['load'][year]
-            plt.plot(hourly_data.index, hourly_data, alpha=0.3, label=str(year))
-
-
-        plt.plot(hourly_avg_overall.index, hourly_avg_overall['load'], color='blue', linewidth=3, label='Average Load')
-
-
-        plt.title(f'Historical {data_map[table]} Load Data - Hourly Averages', fontsize=16)
-        plt.xlabel('Hour of Day', fontsize=12)
-        plt.ylabel('Load (MW)', fontsize=12)
-
-
-        plt.xticks(range(0, 24), [f'{i}:00' for i in range(0, 24)])
-        plt.xlim([0, 23])
-
-        plt.legend(title='Year', loc='upper right', bbox_to_anchor=(1.05, 1))
-        plt.grid(True)
-        plt.tight_layout()
-    elif data_type == "fuel_mix":
-        if 'nyiso' in table:
-            for fuel_source in nyiso_fuel_sources:
-                plt.bar(hourly_avg_overall.index,
-                    hourly_avg_overall[fuel_source],
-                    bottom=bottoms,
-                    label=fuel_source,
-                    color=cm.get_cmap('tab20c', len(nyiso_fuel_sources))(nyiso_fuel_sources.index(fuel_source)),
-                    alpha=0.7)
-                bottoms = [bottom + value for bottom, value in zip(bottoms, hourly_avg_overall[fuel_source])]
-
-            plt.title(f'Historical {data_map[table]} Fuel Mix - Hourly Averages', fontsize=16)
-            plt.xlabel('Hour of Day', fontsize=12)
-            plt.ylabel('Total Energy Generation (MW)', fontsize=12)
-
-            plt.xticks(range(0, 24), [f'{i}:00' for i in range(0, 24)])
-            plt.xlim([0, 23])
-            plt.legend(title="Energy Sources", bbox_to_anchor=(1.05, 1), loc='upper right')
-
-            plt.grid(True)
-            plt.tight_layout()
-        elif 'caiso' in table:
-            for fuel_source in caiso_fuel_sources:
-                plt.bar(hourly_avg_overall.index,
-                    hourly_avg_overall[fuel_source],
-                    bottom=bottoms,
-                    label=fuel_source,
-                    color=cm.get_cmap('tab20c', len(caiso_fuel_sources))(caiso_fuel_sources.index(fuel_source)),
-                    alpha=0.7)
-                bottoms = [bottom + value for bottom, value in zip(bottoms, hourly_avg_overall[fuel_source])]
-
-            plt.title(f'Historical {data_map[table]} Fuel Mix - Hourly Averages', fontsize=16)
-            plt.xlabel('Hour of Day', fontsize=12)
-            plt.ylabel('Total Energy Generation (MW)', fontsize=12)
-
-            plt.xticks(range(0, 24), [f'{i}:00' for i in range(0, 24)])
-            plt.xlim([0, 23])
-            plt.legend(title="Energy Sources", bbox_to_anchor=(1.05, 1), loc='upper right')
-
-            plt.grid(True)
-            plt.tight_layout()
-        elif 'isone' in table:
-            for fuel_source in isone_fuel_sources:
-                plt.bar(hourly_avg_overall.index,
-                    hourly_avg_overall[fuel_source],
-                    bottom=bottoms,
-                    label=fuel_source,
-                    color=cm.get_cmap('tab20c', len(isone_fuel_sources))(isone_fuel_sources.index(fuel_source)),
-                    alpha=0.7)
-                bottoms = [bottom + value for bottom, value in zip(bottoms, hourly_avg_overall[fuel_source])]
-
-            plt.title(f'Historical {data_map[table]} Fuel Mix - Hourly Averages', fontsize=16)
-            plt.xlabel('Hour of Day', fontsize=12)
-            plt.ylabel('Total Energy Generation (MW)', fontsize=12)
-
-            plt.xticks(range(0, 24), [f'{i}:00' for i in range(0, 24)])
-            plt.xlim([0, 23])
-            plt.legend(title="Energy Sources", bbox_to_anchor=(1.05, 1), loc='upper right')
-
-            plt.grid(True)
-            plt.tight_layout()        
-    return fig
-
-## SPLIT nyiso, caiso, isone replots
+def get_prefetcher():
+    return Prefetcher()
+
+def saved_range(iso, kind):
+    # Widget state is dropped while a panel is not shown, so the chosen dates are kept separately
+    since, start = iso.history[kind]
+    return st.session_state.get(f'{iso.table(kind)}_range', (start, datetime.date.today()))
+
+def prefetch_panel(iso):
+    for kind in KINDS:
+        table = iso.table(kind)
+        timemin, timemax = saved_range(iso, kind)
+        for view in VIEWS:
+            get_prefetcher().submit((table, timemin, timemax, view),
+                                    lambda table=table, timemin=timemin, timemax=timemax, view=view:
+                                    prerender(plot_table_based_on_timerange(timemin, timemax, table, view)))
+
+## Replots
+
+def chart_set():
+    # Per session: the charts on screen and the (timemin, timemax, table, view) each was built from
+    if 'eda_charts' not in st.session_state:
+        st.session_state.eda_charts = ChartSet()
+    return st.session_state.eda_charts
 
 @st.fragment()
-def trigger_nyiso_replots():
-        with col1:
-            fig1 = plot_monthly_table_based_on_timerange(nyiso_load_min_time_filter, nyiso_load_max_time_filter, 'nyiso_load')
-            fig2 = plot_weekly_table_based_on_timerange(nyiso_load_min_time_filter, nyiso_load_max_time_filter, 'nyiso_load')
-            fig3 = plot_daily_table_based_on_timerange(nyiso_load_min_time_filter, nyiso_load_max_time_filter, 'nyiso_load')
-
-            plot_monthly_placeholder.pyplot(fig1)
-
-            plot_weekly_placeholder.pyplot(fig2)
-
-            plot_daily_placeholder.pyplot(fig3)
-
-        
-        with col2:
-            fig4 = plot_monthly_table_based_on_timerange(nyiso_fuel_mix_min_time_filter, nyiso_fuel_mix_max_time_filter, 'nyiso_fuel_mix')
-            fig5 = plot_weekly_table_based_on_timerange(nyiso_fuel_mix_min_time_filter, nyiso_fuel_mix_max_time_filter, 'nyiso_fuel_mix')
-            fig6 = plot_daily_table_based_on_timerange(nyiso_fuel_mix_min_time_filter, nyiso_fuel_mix_max_time_filter, 'nyiso_fuel_mix')
-
-            plot_monthly_fuel_mix_placeholder.pyplot(fig4)
-
-            plot_weekly_fuel_mix_placeholder.pyplot(fig5)
-
-            plot_daily_fuel_mix_placeholder.pyplot(fig6)
-
-
-@st.fragment()
-def trigger_caiso_replots():
-        with col1:
-            fig1 = plot_monthly_table_based_on_timerange(caiso_load_min_time_filter, caiso_load_max_time_filter, 'caiso_load')
-            fig2 = plot_weekly_table_based_on_timerange(caiso_load_min_time_filter, caiso_load_max_time_filter, 'caiso_load')
-            fig3 = plot_daily_table_based_on_timerange(caiso_load_min_time_filter, caiso_load_max_time_filter, 'caiso_load')
-
-            plot_monthly_placeholder.pyplot(fig1)
-
-            plot_weekly_placeholder.pyplot(fig2)
-
-            plot_daily_placeholder.pyplot(fig3)
-
-        
-        with col2:
-            fig4 = plot_monthly_table_based_on_timerange(caiso_fuel_mix_min_time_filter, caiso_fuel_mix_max_time_filter, 'caiso_fuel_mix')
-            fig5 = plot_weekly_table_based_on_timerange(caiso_fuel_mix_min_time_filter, caiso_fuel_mix_max_time_filter, 'caiso_fuel_mix')
-            fig6 = plot_daily_table_based_on_timerange(caiso_fuel_mix_min_time_filter, caiso_fuel_mix_max_time_filter, 'caiso_fuel_mix')
-
-            plot_monthly_fuel_mix_placeholder.pyplot(fig4)
-
-            plot_weekly_fuel_mix_placeholder.pyplot(fig5)
-
-            plot_daily_fuel_mix_placeholder.pyplot(fig6)
-
-@st.fragment()
-def trigger_isone_replots():
-        with col1:
-            fig1 = plot_monthly_table_based_on_timerange(isone_load_min_time_filter, isone_load_max_time_filter, 'isone_load')
-            fig2 = plot_weekly_table_based_on_timerange(isone_load_min_time_filter, isone_load_max_time_filter, 'isone_load')
-            fig3 = plot_daily_table_based_on_timerange(isone_load_min_time_filter, isone_load_max_time_filter, 'isone_load')
-
-            plot_monthly_placeholder.pyplot(fig1)
-
-            plot_weekly_placeholder.pyplot(fig2)
-
-            plot_daily_placeholder.pyplot(fig3)
-
-        
-        with col2:
-            fig4 = plot_monthly_table_based_on_timerange(isone_fuel_mix_min_time_filter, isone_fuel_mix_max_time_filter, 'isone_fuel_mix')
-            fig5 = plot_weekly_table_based_on_timerange(isone_fuel_mix_min_time_filter, isone_fuel_mix_max_time_filter, 'isone_fuel_mix')
-            fig6 = plot_daily_table_based_on_timerange(isone_fuel_mix_min_time_filter, isone_fuel_mix_max_time_filter, 'isone_fuel_mix')
-
-            plot_monthly_fuel_mix_placeholder.pyplot(fig4)
-
-            plot_weekly_fuel_mix_placeholder.pyplot(fig5)
-
-            plot_daily_fuel_mix_placeholder.pyplot(fig6)
+def render_table_panel(iso_key, kind):
+    # A date change reruns only this fragment: one table's three charts, not the whole ISO
+    iso = ISOS[iso_key]
+    table = iso.table(kind)
+    since, _ = iso.history[kind]
+    timemin, timemax = saved_range(iso, kind)
+
+    timemin = st.date_input("Start date:", 
+                            value=timemin, 
+                            min_value=since, 
+                            max_value=datetime.date.today(),
+                            key=f'{table}_min')
+    timemax = st.date_input("End date:", 
+                            value=timemax, 
+                            min_value=since, 
+                            max_value=datetime.date.today(),
+                            key=f'{table}_max')
+    st.session_state[f'{table}_range'] = (timemin, timemax)
+
+    for view in VIEWS:
+        chart = chart_set().get((table, view), (timemin, timemax, table, view), plot_table_based_on_timerange)
+        show_chart(st, chart)
+
+def render_panel(iso):
+    st.write(f"EDA plots for {iso.label}.")
+
+    columns = st.columns(len(KINDS), vertical_alignment = "center")
+
+    for column, kind in zip(columns, KINDS):
+        with column:
+            render_table_panel(iso.key, kind)
 
 ## Streamlit Web App: EDA portion
 
@@ -452,150 +115,16 @@ st.write(
     "These are EDA plots. You can choose the timerange you want to explore."
 )
 
-#st.subheader("NYISO")
-isone_eda_tab, caiso_eda_tab, nyiso_eda_tab = st.tabs(["ISONE", "CAISO", "NYISO"])
-
-
-with isone_eda_tab:
-    st.write("EDA plots for ISONE.")
-
-    col1, col2 = st.columns(2, vertical_alignment = "center")
-
-    with col1:
-        isone_load_min_time_filter = st.date_input("Start date:", 
-                                            value=pd.to_datetime('2023-01-01'), 
-                                            min_value=pd.to_datetime('2022-07-01'), 
-                                            max_value=datetime.date.today(),
-                                            on_change=trigger_isone_replots,
-                                            key='isone_load_min')
-        isone_load_max_time_filter = st.date_input("End date:", 
-                                            value=datetime.date.today(), 
-                                            min_value=pd.to_datetime('2022-07-01'), 
-                                            max_value=datetime.date.today(),
-                                            on_change=trigger_isone_replots,
-                                            key='isone_load_max')
-        plot_monthly_placeholder = st.empty()
-        plot_weekly_placeholder = st.empty()
-        plot_daily_placeholder = st.empty() 
-        plot_monthly_placeholder.pyplot(plot_monthly_table_based_on_timerange(isone_load_min_time_filter, isone_load_max_time_filter, 'isone_load'))
-        plot_weekly_placeholder.pyplot(plot_weekly_table_based_on_timerange(isone_load_min_time_filter, isone_load_max_time_filter, 'isone_load'))
-        plot_daily_placeholder.pyplot(plot_daily_table_based_on_timerange(isone_load_min_time_filter, isone_load_max_time_filter, 'isone_load'))
-
-    with col2:
-        isone_fuel_mix_min_time_filter = st.date_input("Start date:", 
-                                            value=pd.to_datetime('2021-01-01'), 
-                                            min_value=pd.to_datetime('2018-01-01'), 
-                                            max_value=datetime.date.today(),
-                                            on_change=trigger_isone_replots,
-                                            key='isone_fuel_mix_min')
-        isone_fuel_mix_max_time_filter = st.date_input("End date:", 
-                                            value=datetime.date.today(), 
-                                            min_value=pd.to_datetime('2018-01-01'), 
-                                            max_value=datetime.date.today(),
-                                            on_change=trigger_isone_replots,
-                                            key='isone_fuel_mix_max')
-
-        plot_monthly_fuel_mix_placeholder = st.empty()
-        plot_weekly_fuel_mix_placeholder = st.empty()
-        plot_daily_fuel_mix_placeholder = st.empty()
-        plot_monthly_fuel_mix_placeholder.pyplot(plot_monthly_table_based_on_timerange(isone_fuel_mix_min_time_filter, isone_fuel_mix_max_time_filter, 'isone_fuel_mix'))
-        plot_weekly_fuel_mix_placeholder.pyplot(plot_weekly_table_based_on_timerange(isone_fuel_mix_min_time_filter, isone_fuel_mix_max_time_filter, 'isone_fuel_mix'))
-        plot_daily_fuel_mix_placeholder.pyplot(plot_daily_table_based_on_timerange(isone_fuel_mix_min_time_filter, isone_fuel_mix_max_time_filter, 'isone_fuel_mix'))
-
-with caiso_eda_tab:
-    st.write("EDA plots for CAISO.")
-
-    col1, col2 = st.columns(2, vertical_alignment = "center")
-
-    with col1:
-        caiso_load_min_time_filter = st.date_input("Start date:", 
-                                            value=pd.to_datetime('2021-01-01'), 
-                                            min_value=pd.to_datetime('2002-01-01'), 
-                                            max_value=datetime.date.today(),
-                                            on_change=trigger_caiso_replots,
-                                            key='caiso_load_min')
-        caiso_load_max_time_filter = st.date_input("End date:", 
-                                            value=datetime.date.today(), 
-                                            min_value=pd.to_datetime('2002-01-01'), 
-                                            max_value=datetime.date.today(),
-                                            on_change=trigger_caiso_replots,
-                                            key='caiso_load_max')
-        plot_monthly_placeholder = st.empty()
-        plot_weekly_placeholder = st.empty()
-        plot_daily_placeholder = st.empty() 
-        plot_monthly_placeholder.pyplot(plot_monthly_table_based_on_timerange(caiso_load_min_time_filter, caiso_load_max_time_filter, 'caiso_load'))
-        plot_weekly_placeholder.pyplot(plot_weekly_table_based_on_timerange(caiso_load_min_time_filter, caiso_load_max_time_filter, 'caiso_load'))
-        plot_daily_placeholder.pyplot(plot_daily_table_based_on_timerange(caiso_load_min_time_filter, caiso_load_max_time_filter, 'caiso_load'))
-
-    with col2:
-        caiso_fuel_mix_min_time_filter = st.date_input("Start date:", 
-                                            value=pd.to_datetime('2021-01-01'), 
-                                            min_value=pd.to_datetime('2019-01-01'), 
-                                            max_value=datetime.date.today(),
-                                            on_change=trigger_caiso_replots,
-                                            key='caiso_fuel_mix_min')
-        caiso_fuel_mix_max_time_filter = st.date_input("End date:", 
-                                            value=datetime.date.today(), 
-                                            min_value=pd.to_datetime('2019-01-01'), 
-                                            max_value=datetime.date.today(),
-                                            on_change=trigger_caiso_replots,
-                                            key='caiso_fuel_mix_max')
-
-        plot_monthly_fuel_mix_placeholder = st.empty()
-        plot_weekly_fuel_mix_placeholder = st.empty()
-        plot_daily_fuel_mix_placeholder = st.empty()
-        plot_monthly_fuel_mix_placeholder.pyplot(plot_monthly_table_based_on_timerange(caiso_fuel_mix_min_time_filter, caiso_fuel_mix_max_time_filter, 'caiso_fuel_mix'))
-        plot_weekly_fuel_mix_placeholder.pyplot(plot_weekly_table_based_on_timerange(caiso_fuel_mix_min_time_filter, caiso_fuel_mix_max_time_filter, 'caiso_fuel_mix'))
-        plot_daily_fuel_mix_placeholder.pyplot(plot_daily_table_based_on_timerange(caiso_fuel_mix_min_time_filter, caiso_fuel_mix_max_time_filter, 'caiso_fuel_mix'))
-
-   
-
-with nyiso_eda_tab:
-    st.write("EDA plots for NYISO.")
-
-    col1, col2 = st.columns(2, vertical_alignment = "center")
-
-    with col1:
-        nyiso_load_min_time_filter = st.date_input("Start date:", 
-                                            value=pd.to_datetime('2021-01-01'), 
-                                            min_value=pd.to_datetime('2002-01-01'), 
-                                            max_value=datetime.date.today(),
-                                            on_change=trigger_nyiso_replots,
-                                            key='nyiso_load_min')
-        nyiso_load_max_time_filter = st.date_input("End date:", 
-                                            value=datetime.date.today(), 
-                                            min_value=pd.to_datetime('2002-01-01'), 
-                                            max_value=datetime.date.today(),
-                                            on_change=trigger_nyiso_replots,
-                                            key='nyiso_load_max')
-        plot_monthly_placeholder = st.empty()
-        plot_weekly_placeholder = st.empty()
-        plot_daily_placeholder = st.empty() 
-        plot_monthly_placeholder.pyplot(plot_monthly_table_based_on_timerange(nyiso_load_min_time_filter, nyiso_load_max_time_filter, 'nyiso_load'))
-        plot_weekly_placeholder.pyplot(plot_weekly_table_based_on_timerange(nyiso_load_min_time_filter, nyiso_load_max_time_filter, 'nyiso_load'))
-        plot_daily_placeholder.pyplot(plot_daily_table_based_on_timerange(nyiso_load_min_time_filter, nyiso_load_max_time_filter, 'nyiso_load'))
-
-    with col2:
-        nyiso_fuel_mix_min_time_filter = st.date_input("Start date:", 
-                                            value=pd.to_datetime('2021-01-01'), 
-                                            min_value=pd.to_datetime('2018-01-01'), 
-                                            max_value=datetime.date.today(),
-                                            on_change=trigger_nyiso_replots,
-                                            key='nyiso_fuel_mix_min')
-        nyiso_fuel_mix_max_time_filter = st.date_input("End date:", 
-                                            value=datetime.date.today(), 
-                                            min_value=pd.to_datetime('2002-01-01'), 
-                                            max_value=datetime.date.today(),
-                                            on_change=trigger_nyiso_replots,
-                                            key='nyiso_fuel_mix_max')
-
-        plot_monthly_fuel_mix_placeholder = st.empty()
-        plot_weekly_fuel_mix_placeholder = st.empty()
-        plot_daily_fuel_mix_placeholder = st.empty()
-        plot_monthly_fuel_mix_placeholder.pyplot(plot_monthly_table_based_on_timerange(nyiso_fuel_mix_min_time_filter, nyiso_fuel_mix_max_time_filter, 'nyiso_fuel_mix'))
-        plot_weekly_fuel_mix_placeholder.pyplot(plot_weekly_table_based_on_timerange(nyiso_fuel_mix_min_time_filter, nyiso_fuel_mix_max_time_filter, 'nyiso_fuel_mix'))
-        plot_daily_fuel_mix_placeholder.pyplot(plot_daily_table_based_on_timerange(nyiso_fuel_mix_min_time_filter, nyiso_fuel_mix_max_time_filter, 'nyiso_fuel_mix'))
-
+# Only the selected ISO is computed and rendered; the others are warmed up in the background
+isos = enabled_isos()
+selected = st.radio("ISO", [iso.key for iso in isos], format_func=lambda key: ISOS[key].label,
+                    horizontal=True, label_visibility="collapsed", key='eda_iso')
 
+render_panel(ISOS[selected])
 
+for iso in isos:
+    if iso.key != selected:
+        prefetch_panel(iso)
 
+if show_performance:
+    performance_panel(st.sidebar, extra={'Database': database().stats(), 'Figure cache': FIGURE_CACHE.stats()})
@@ -0,0 +1,164 @@
+import datetime
+import gzip
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from electricity import api
+from electricity.api import ApiError, aggregates_response, series_response
+from electricity.profile import profile_from_frame, view_averages
+
+
+@pytest.mark.parametrize('params', [
+    {'start': '2024-03-01', 'end': '2024-03-01'},
+    {'start': '2024-03-02', 'end': '2024-03-01'},
+    {'start': '2999-01-01'},
+])
+def test_aggregates_reject_empty_ranges(params):
+    with pytest.raises(ApiError) as err:
+        aggregates_response(params, 'json', 'caiso_load', 'monthly')
+    assert err.value.status == 400
+
+
+def test_series_require_start():
+    with pytest.raises(ApiError) as err:
+        series_response({'end': '2024-03-01'}, 'json', 'caiso_load')
+    assert err.value.status == 400
+
+
+def test_unknown_view():
+    with pytest.raises(ApiError) as err:
+        aggregates_response({}, 'json', 'caiso_load', 'yearly')
+    assert err.value.status == 404
+
+
+### Handler
+
+class FakeRangeCache:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def get(self, table, start, end):
+        self.calls.append((table, start, end))
+        return self.rows
+
+
+@pytest.fixture
+def rows():
+    times = pd.date_range('2024-03-01', '2024-03-02', freq='5min', tz='UTC', inclusive='left')
+    return pd.DataFrame({'time': times, 'load': np.linspace(20_000, 30_000, len(times))})
+
+
+@pytest.fixture
+def server(monkeypatch, rows):
+    cache = FakeRangeCache(rows)
+    monkeypatch.setattr(api, 'range_cache', lambda: cache)
+    monkeypatch.setattr(api, 'database', lambda: None)
+    monkeypatch.setattr(api, 'load_profile',
+                        lambda conn, table, start, end, read_rows: profile_from_frame(read_rows(table, start, end), ['load']))
+    monkeypatch.setattr(api, '_responses', {})
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), api.ApiHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, cache
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(server, path, **headers):
+    httpd, _ = server
+    conn = http.client.HTTPConnection(*httpd.server_address)
+    conn.request('GET', path, headers=headers)
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response, body
+
+
+SERIES = '/v1/series/caiso_load?start=2024-03-01&end=2024-03-02'
+
+
+def test_series_json(server, rows):
+    response, body = get(server, SERIES)
+    assert response.status == 200
+    assert response.getheader('Content-Type') == api.JSON_TYPE
+    assert response.getheader('Last-Modified') == 'Fri, 01 Mar 2024 23:55:00 GMT'
+    assert len(json.loads(body)) == len(rows)
+    assert server[1].calls == [('caiso_load', datetime.date(2024, 3, 1), datetime.date(2024, 3, 2))]
+
+
+def test_matching_etag_gets_304(server):
+    response, body = get(server, SERIES)
+    etag = response.getheader('ETag')
+    assert etag.startswith('W/"')
+
+    response, body = get(server, SERIES, **{'If-None-Match': etag})
+    assert response.status == 304
+    assert body == b''
+    assert response.getheader('ETag') == etag
+
+    response, _ = get(server, SERIES, **{'If-None-Match': 'W/"stale"'})
+    assert response.status == 200
+
+
+def test_gzip_only_when_accepted(server):
+    plain, body = get(server, SERIES)
+    assert plain.getheader('Content-Encoding') is None
+
+    response, compressed = get(server, SERIES, **{'Accept-Encoding': 'gzip, deflate'})
+    assert response.getheader('Content-Encoding') == 'gzip'
+    assert len(compressed) < len(body)
+    assert gzip.decompress(compressed) == body
+    assert response.getheader('ETag') == plain.getheader('ETag')
+
+
+@pytest.mark.parametrize('path, headers', [
+    (SERIES + '&format=arrow', {}),
+    (SERIES, {'Accept': api.ARROW_TYPE}),
+])
+def test_arrow_output(server, rows, path, headers):
+    response, body = get(server, path, **headers)
+    assert response.getheader('Content-Type') == api.ARROW_TYPE
+    frame = pa.ipc.open_stream(body).read_all().to_pandas()
+    pd.testing.assert_frame_equal(frame, rows)
+
+
+def test_errors_are_json(server):
+    response, body = get(server, '/v1/series/nope?start=2024-03-01')
+    assert response.status == 404
+    assert json.loads(body) == {'error': 'Unknown table: nope'}
+
+
+@pytest.mark.parametrize('view', ['monthly', 'weekly', 'daily'])
+def test_aggregate_frame(rows, view):
+    key = api.VIEWS[view]
+    per_year, overall = view_averages(profile_from_frame(rows, ['load']), view)
+    frame = api.aggregate_frame(per_year, overall, view)
+
+    assert list(frame.columns) == ['year', key, 'load']
+    assert str(frame['year'].dtype) == 'Int64'
+    yearly = frame[frame['year'].notna()]
+    overall_rows = frame[frame['year'].isna()]
+    assert set(yearly['year']) == {2024}
+    assert len(yearly) == len(overall_rows) == len(overall)
+    np.testing.assert_allclose(yearly['load'], overall_rows['load'])
+    np.testing.assert_allclose(overall_rows.set_index(key)['load'], overall['load'])
+
+
+def test_aggregates_endpoint_caches_responses(server, rows):
+    path = '/v1/aggregates/caiso_load/daily?start=2024-03-01&end=2024-03-02'
+    response, body = get(server, path)
+    assert response.status == 200
+    records = json.loads(body)
+    assert len(records) == 2 * 24
+    assert {record['year'] for record in records} == {2024, None}
+
+    assert get(server, path)[1] == body
+    assert len(server[1].calls) == 1
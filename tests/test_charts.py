@@ -0,0 +1,25 @@
+from electricity.charts import Chart, ChartSet
+
+
+def test_chart_set_rebuilds_only_on_changed_inputs():
+    calls = []
+
+    def build(start, end):
+        calls.append((start, end))
+        return Chart(f'{start}-{end}', 'x', 'y')
+
+    charts = ChartSet()
+    first = charts.get('load', (1, 2), build)
+    assert charts.get('load', (1, 2), build) is first
+    charts.get('fuel_mix', (1, 2), build)
+    changed = charts.get('load', (1, 3), build)
+    assert changed is not first
+    assert calls == [(1, 2), (1, 2), (1, 3)]
+    assert charts.builds == 3
+
+
+def test_digest_follows_content():
+    a = Chart('t', 'x', 'y').line([0, 1, 2], [1.0, 2.0, 3.0])
+    b = Chart('t', 'x', 'y').line([0, 1, 2], [1.0, 2.0, 3.0])
+    c = Chart('t', 'x', 'y').line([0, 1, 2], [1.0, 2.0, 4.0])
+    assert a.digest() == b.digest() != c.digest()
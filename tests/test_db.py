@@ -0,0 +1,55 @@
+import sys
+import types
+
+import pytest
+
+from electricity import db
+
+SECRETS = """
+[connections.postgresql]
+dialect = "postgresql"
+host = "files.example"
+port = 5432
+database = "iso"
+username = "reader"
+password = "secret"
+"""
+
+
+@pytest.fixture
+def secrets_file(tmp_path, monkeypatch):
+    path = tmp_path / 'secrets.toml'
+    path.write_text(SECRETS)
+    monkeypatch.setattr(db, 'SECRETS_PATH', str(path))
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+
+
+def fake_streamlit(monkeypatch, running):
+    runtime = types.ModuleType('streamlit.runtime')
+    runtime.exists = lambda: running
+    st = types.ModuleType('streamlit')
+    st.runtime = runtime
+    st.secrets = {'connections': {'postgresql': {'url': 'postgresql+psycopg2://app@hosted.example/iso'}}}
+    monkeypatch.setitem(sys.modules, 'streamlit', st)
+    monkeypatch.setitem(sys.modules, 'streamlit.runtime', runtime)
+
+
+def test_url_from_secrets_file(secrets_file):
+    url = db.database_url()
+    assert (url.host, url.port, url.database, url.username) == ('files.example', 5432, 'iso', 'reader')
+    assert url.drivername == 'postgresql+psycopg2'
+
+
+def test_environment_wins(secrets_file, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///iso.db')
+    assert db.database_url() == 'sqlite:///iso.db'
+
+
+def test_url_from_st_secrets_in_a_running_app(secrets_file, monkeypatch):
+    fake_streamlit(monkeypatch, running=True)
+    assert db.database_url() == 'postgresql+psycopg2://app@hosted.example/iso'
+
+
+def test_secrets_file_when_streamlit_is_only_imported(secrets_file, monkeypatch):
+    fake_streamlit(monkeypatch, running=False)
+    assert db.database_url().host == 'files.example'
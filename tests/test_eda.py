@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from electricity import schemas
+from electricity.charts import render_matplotlib, render_plotly
+from electricity.eda import average_chart
+from electricity.profile import profile_from_frame, view_averages
+
+
+def empty_profiles(table):
+    columns = schemas.value_columns(table)
+    yield profile_from_frame(schemas.empty_frame(table), columns)
+    yield profile_from_frame(pd.DataFrame(columns=['time'] + columns), columns)
+
+
+@pytest.mark.parametrize('table', ['caiso_load', 'caiso_fuel_mix'])
+@pytest.mark.parametrize('view', ['monthly', 'weekly', 'daily'])
+def test_empty_profile_draws_an_empty_chart(table, view):
+    for profile in empty_profiles(table):
+        chart = average_chart(table, view, *view_averages(profile, view))
+        assert chart.series == []
+        render_matplotlib(chart)
+        render_plotly(chart)
+
+
+def test_load_chart_has_a_line_per_year_and_the_average():
+    times = pd.date_range('2022-01-01', '2024-01-01', freq='h', tz='UTC', inclusive='left')
+    rows = pd.DataFrame({'time': times, 'load': 1.0})
+    chart = average_chart('caiso_load', 'monthly', *view_averages(profile_from_frame(rows, ['load']), 'monthly'))
+    per_year, average = chart.series
+    assert per_year['labels'] == ['2022', '2023'] and average['label'] == 'Average Load'
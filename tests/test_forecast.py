@@ -0,0 +1,41 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import load_frame
+from electricity.forecast import features, fit_and_forecast
+
+DAY = datetime.date(2024, 6, 1)
+
+
+def history(unit):
+    times = pd.date_range(DAY - datetime.timedelta(days=120), DAY + datetime.timedelta(days=1), freq='5min',
+                          tz='UTC', inclusive='left', unit=unit)
+    rows = load_frame('caiso', times, seed=5)
+    return pd.DatetimeIndex(rows['time']), rows['load'].to_numpy(dtype='float64')
+
+
+def test_features_do_not_depend_on_resolution():
+    times = pd.date_range('2024-03-01', periods=500, freq='5min', tz='US/Pacific')
+    expected = features(times.as_unit('ns'))
+    for unit in ('us', 's'):
+        np.testing.assert_allclose(features(times.as_unit(unit)), expected)
+
+
+@pytest.mark.parametrize('unit', ['ns', 'us', 's'])
+def test_forecast_of_seasonal_load(unit):
+    times, y = history(unit)
+    held_out = times >= pd.Timestamp(DAY, tz='UTC')
+    state, forecast, _ = fit_and_forecast(None, times[~held_out], y[~held_out], DAY)
+
+    assert len(forecast) == 288
+    assert (forecast['ds'] == times[held_out]).all()
+    mape = np.mean(np.abs(forecast['yhat'].to_numpy() - y[held_out]) / y[held_out])
+    assert mape < 0.03
+    assert (forecast['yhat_lower'] < forecast['yhat']).all() and (forecast['yhat'] < forecast['yhat_upper']).all()
+
+    # warm start: the next day's actuals are scored against the previous fit
+    _, _, score = fit_and_forecast(state, times[held_out], y[held_out], DAY + datetime.timedelta(days=1))
+    assert score == pytest.approx(mape, rel=0.2)
@@ -0,0 +1,146 @@
+import datetime
+import os
+
+import pandas as pd
+import pytest
+
+from electricity import ingest, schemas
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+@pytest.fixture
+def source():
+    return ingest.FixtureSource(FIXTURES)
+
+
+def test_normalize_matches_declared_schema(source):
+    frame = ingest.normalize(source.fetch('caiso_fuel_mix', 'today'), 'caiso_fuel_mix')
+    assert list(frame.columns) == schemas.columns('caiso_fuel_mix')
+    assert str(frame['time'].dt.tz) == 'UTC'
+    assert all(frame[column].dtype == schemas.VALUE_DTYPE for column in schemas.value_columns('caiso_fuel_mix'))
+
+
+def test_normalize_sorts_and_keeps_last_duplicate(source):
+    raw = source.fetch('caiso_load', 'today')
+    frame = ingest.normalize(raw, 'caiso_load')
+    assert len(frame) == raw['Time'].nunique()
+    assert frame['time'].is_monotonic_increasing
+    revised = pd.Timestamp('2024-03-01 00:50', tz='US/Pacific').tz_convert('UTC')
+    assert frame.loc[frame['time'] == revised, 'load'].item() == 12345.0
+
+
+def test_normalize_fills_missing_fuel_sources(source):
+    frame = ingest.normalize(source.fetch('nyiso_fuel_mix', 'today'), 'nyiso_fuel_mix')
+    assert list(frame.columns) == schemas.columns('nyiso_fuel_mix')
+    assert frame['dual_fuel'].isna().all()
+    assert frame['wind'].notna().all()
+
+
+def test_fixture_source_range(source):
+    res = source.fetch('caiso_load', datetime.date(2024, 3, 1), datetime.date(2024, 3, 2))
+    assert len(res) == 37
+    assert source.fetch('caiso_load', datetime.date(2024, 3, 2), datetime.date(2024, 3, 3)).empty
+
+
+def test_chunks_cover_range_without_overlap():
+    start, end = datetime.date(2024, 1, 1), datetime.date(2024, 1, 20)
+    parts = list(ingest.chunks(start, end, days=7))
+    assert parts[0][0] == start and parts[-1][1] == end
+    assert all(a_end == b_start for (_, a_end), (b_start, _) in zip(parts, parts[1:]))
+    assert [(e - s).days for s, e in parts] == [7, 7, 5]
+    assert list(ingest.chunks(end, end)) == []
+
+
+class RecordingCursor:
+    def __init__(self, fail_on=None):
+        self.statements = []
+        self.copies = []
+        self.fail_on = fail_on
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError('boom')
+        self.statements.append(' '.join(sql.split()))
+
+    def copy_expert(self, sql, buffer):
+        self.copies.append((sql, buffer.read()))
+
+
+class RecordingConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.events = []
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.events.append('commit')
+
+    def rollback(self):
+        self.events.append('rollback')
+
+    def close(self):
+        self.events.append('close')
+
+
+class RecordingEngine:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def raw_connection(self):
+        return self.connection
+
+
+def test_copy_merge_batches_and_upserts_on_time(source, monkeypatch):
+    monkeypatch.setattr(ingest, 'BATCH_ROWS', 10)
+    frame = ingest.normalize(source.fetch('caiso_load', 'today'), 'caiso_load')
+    cursor = RecordingCursor()
+    ingest.copy_merge(cursor, 'caiso_load', frame)
+
+    assert cursor.statements[0].startswith('CREATE TEMP TABLE staging_caiso_load (LIKE caiso_load')
+    assert len(cursor.copies) == 4
+    assert sum(len(data.splitlines()) for _, data in cursor.copies) == len(frame)
+    assert cursor.copies[0][0] == 'COPY staging_caiso_load (time, load) FROM STDIN WITH (FORMAT csv)'
+    assert cursor.statements[-1] == ('INSERT INTO caiso_load (time, load) SELECT time, load FROM staging_caiso_load '
+                                     'ON CONFLICT (time) DO UPDATE SET load = EXCLUDED.load;')
+
+
+def test_copy_merge_upserts_forecasts_on_ds():
+    frame = pd.DataFrame({'ds': pd.date_range('2024-03-01', periods=3, freq='5min', tz='UTC'),
+                          'yhat': [1.0, 2.0, 3.0], 'yhat_lower': [0.5, 1.5, 2.5], 'yhat_upper': [1.5, 2.5, 3.5]})
+    cursor = RecordingCursor()
+    ingest.copy_merge(cursor, 'forecast_dayof_caiso', frame)
+    assert cursor.statements[-1].endswith('ON CONFLICT (ds) DO UPDATE SET yhat = EXCLUDED.yhat, '
+                                          'yhat_lower = EXCLUDED.yhat_lower, yhat_upper = EXCLUDED.yhat_upper;')
+
+
+def test_copy_upsert_tables_is_one_transaction(source):
+    frames = {table: ingest.normalize(source.fetch(table, 'today'), table) for table in ['caiso_load', 'caiso_fuel_mix']}
+    connection = RecordingConnection(RecordingCursor())
+    written = ingest.copy_upsert_tables(RecordingEngine(connection), {**frames, 'nyiso_load': frames['caiso_load'].iloc[:0]})
+    assert written == {table: len(frame) for table, frame in frames.items()}
+    assert connection.events == ['commit', 'close']
+
+
+def test_copy_upsert_tables_rolls_back_on_error(source):
+    frame = ingest.normalize(source.fetch('caiso_load', 'today'), 'caiso_load')
+    connection = RecordingConnection(RecordingCursor(fail_on='INSERT INTO'))
+    with pytest.raises(RuntimeError):
+        ingest.copy_upsert_tables(RecordingEngine(connection), {'caiso_load': frame})
+    assert connection.events == ['rollback', 'close']
+
+
+def test_copy_merge_rejects_unknown_tables(source):
+    frame = ingest.normalize(source.fetch('caiso_load', 'today'), 'caiso_load')
+    cursor = RecordingCursor()
+    with pytest.raises(ValueError):
+        ingest.copy_merge(cursor, 'caiso_load_unpartitioned', frame)
+    assert cursor.statements == []
@@ -0,0 +1,59 @@
+import datetime
+
+import pandas as pd
+
+from electricity.intraday import IntradayCache
+
+
+class CurrentDayView:
+    # Stand-in for Database.query against <table>_current_day
+    def __init__(self):
+        self.day = None
+        self.rows = pd.DataFrame({'time': pd.Series(dtype='datetime64[ns, UTC]'), 'load': pd.Series(dtype='float32')})
+        self.queries = []
+
+    def publish(self, day, periods):
+        times = pd.date_range(day, periods=periods, freq='5min', tz='UTC')
+        self.day = day
+        self.rows = pd.DataFrame({'time': times, 'load': [float(i) for i in range(periods)]})
+
+    def query(self, sql, params=None, **kwargs):
+        self.queries.append(sql)
+        rows = self.rows
+        if 'WHERE' in sql:
+            rows = rows[rows['time'] > pd.Timestamp(params['after'])]
+        # newest first, as nothing promises an order
+        return rows.iloc[::-1].assign(operating_day=self.day)[['operating_day', 'time', 'load']]
+
+
+def test_empty_view():
+    day, rows = IntradayCache('caiso_load').get(CurrentDayView())
+    assert day is None and rows.empty
+
+
+def test_refresh_appends_only_new_rows():
+    view = CurrentDayView()
+    cache = IntradayCache('caiso_load')
+    view.publish(datetime.date(2024, 3, 1), 12)
+    cache.get(view)
+    view.publish(datetime.date(2024, 3, 1), 20)
+    day, rows = cache.get(view)
+
+    assert day == datetime.date(2024, 3, 1)
+    assert 'WHERE' not in view.queries[0] and 'WHERE' in view.queries[1]
+    assert len(rows) == 20
+    assert rows['time'].is_monotonic_increasing and rows['time'].is_unique
+    assert 'operating_day' not in rows.columns
+
+
+def test_new_operating_day_replaces_rows():
+    view = CurrentDayView()
+    cache = IntradayCache('caiso_load')
+    view.publish(datetime.date(2024, 3, 1), 288)
+    cache.get(view)
+    view.publish(datetime.date(2024, 3, 2), 3)
+    day, rows = cache.get(view)
+
+    assert day == datetime.date(2024, 3, 2)
+    assert len(rows) == 3
+    assert rows['time'].min() == pd.Timestamp('2024-03-02', tz='UTC')
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from electricity.lttb import lttb, lttb_indices
+
+
+def test_short_series_is_kept_whole():
+    assert list(lttb_indices(np.arange(10), np.arange(10), 50)) == list(range(10))
+
+
+def test_keeps_threshold_points_including_ends():
+    x = np.arange(10_000)
+    y = np.sin(x / 100)
+    keep = lttb_indices(x, y, 500)
+    assert len(keep) == 500
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_keeps_a_spike():
+    y = np.zeros(5_000)
+    y[2_345] = 100.0
+    _, reduced = lttb(np.arange(len(y)), y, 100)
+    assert reduced.max() == 100.0
+
+
+def test_accepts_timestamps():
+    times = pd.date_range('2024-01-01', periods=2_000, freq='5min', tz='UTC')
+    x, y = lttb(times.values, np.cos(np.arange(2_000) / 50), 200)
+    assert len(x) == 200 and x[0] == times.values[0]
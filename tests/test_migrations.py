@@ -0,0 +1,32 @@
+from electricity import migrations
+
+
+class Catalog:
+    # SQLAlchemy connection stand-in: records statements, answers relkind and to_regclass lookups
+    def __init__(self, relkind, index=None):
+        self.statements = []
+        self.answers = {'relkind': relkind, 'to_regclass': index}
+        self.answer = None
+
+    def execute(self, statement, params=None):
+        sql = ' '.join(str(statement).split())
+        self.statements.append(sql)
+        self.answer = next((value for key, value in self.answers.items() if key in sql), None)
+        return self
+
+    def scalar(self):
+        return self.answer
+
+
+def test_plain_table_is_deduplicated_before_its_unique_index():
+    conn = Catalog('r')
+    migrations.ensure_table(conn, 'caiso_load')
+    delete, create = conn.statements[-2:]
+    assert delete == 'DELETE FROM caiso_load a USING caiso_load b WHERE a.time = b.time AND a.ctid < b.ctid;'
+    assert create == 'CREATE UNIQUE INDEX caiso_load_time_key ON caiso_load (time);'
+
+
+def test_plain_table_with_its_index_is_left_alone():
+    conn = Catalog('r', index='caiso_load_time_key')
+    migrations.ensure_table(conn, 'caiso_load')
+    assert not any(sql.startswith(('DELETE', 'CREATE')) for sql in conn.statements)
@@ -0,0 +1,90 @@
+import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from electricity import parquet_store
+
+
+def rows(start, end):
+    times = pd.date_range(start, end, freq='h', tz='UTC', inclusive='left')
+    return pd.DataFrame({'time': times, 'load': [float(i) for i in range(len(times))]}).astype({'load': 'float32'})
+
+
+class Postgres:
+    # Stand-in for Database.query / Database.stream, recording the ranges asked for
+    def __init__(self):
+        self.ranges = []
+
+    def _rows(self, params):
+        assert all(bound.tzinfo is not None for bound in params.values())
+        start, end = params['timemin'].date(), params['timemax'].date() if 'timemax' in params else None
+        self.ranges.append((start, end))
+        return rows(start, end or datetime.date(2018, 12, 1))
+
+    def query(self, sql, params=None, **kwargs):
+        return self._rows(params)
+
+    def stream(self, sql, params=None, chunk_rows=None, **kwargs):
+        yield self._rows(params)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(parquet_store, 'STORE_DIR', str(tmp_path))
+
+    def write(*months):
+        (tmp_path / 'caiso_load').mkdir(exist_ok=True)
+        for month in months:
+            frame = rows(month, parquet_store.next_month(month))
+            pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), parquet_store.partition_path('caiso_load', month))
+    return write
+
+
+def test_leading_months_without_partitions_come_from_postgres(store):
+    store(*[datetime.date(2018, month, 1) for month in (3, 4, 5, 6)])
+    conn = Postgres()
+    res = parquet_store.read_range(conn, 'caiso_load', datetime.date(2018, 1, 1), datetime.date(2018, 5, 1))
+
+    assert conn.ranges == [(datetime.date(2018, 1, 1), datetime.date(2018, 3, 1))]
+    assert len(res) == 24 * (31 + 28 + 31 + 30)
+    assert res['time'].is_monotonic_increasing and res['time'].is_unique
+
+
+def test_every_gap_is_queried(store):
+    store(datetime.date(2018, 3, 1), datetime.date(2018, 5, 1))
+    conn = Postgres()
+    res = parquet_store.read_range(conn, 'caiso_load', datetime.date(2018, 3, 15), None)
+
+    assert conn.ranges == [(datetime.date(2018, 4, 1), datetime.date(2018, 5, 1)), (datetime.date(2018, 6, 1), None)]
+    assert res['time'].iloc[0] == pd.Timestamp('2018-03-15', tz='UTC')
+    assert res['time'].diff().dropna().eq(pd.Timedelta(hours=1)).all()
+
+
+def test_stream_fills_the_same_gaps(store):
+    store(datetime.date(2018, 3, 1), datetime.date(2018, 5, 1))
+    conn = Postgres()
+    chunks = list(parquet_store.iter_range(conn, 'caiso_load', datetime.date(2018, 2, 1), datetime.date(2018, 6, 1)))
+
+    assert conn.ranges == [(datetime.date(2018, 2, 1), datetime.date(2018, 3, 1)),
+                           (datetime.date(2018, 4, 1), datetime.date(2018, 5, 1))]
+    assert sum(len(chunk) for chunk in chunks) == 24 * (28 + 31 + 30 + 31)
+
+
+def test_fully_local_range_asks_postgres_nothing(store):
+    store(datetime.date(2018, 3, 1), datetime.date(2018, 4, 1))
+    conn = Postgres()
+    res = parquet_store.read_range(conn, 'caiso_load', datetime.date(2018, 3, 10), datetime.date(2018, 4, 10))
+    assert conn.ranges == [] and len(res) == 24 * 31
+
+
+def test_resync_rewrites_overlapping_partitions_in_place(store, monkeypatch):
+    months = [datetime.date(2018, month, 1) for month in (2, 3, 4, 5)]
+    store(*months)
+    written = []
+    monkeypatch.setattr(parquet_store, 'write_partition', lambda engine, table, month: written.append(month))
+    assert parquet_store.resync_range(None, 'caiso_load', datetime.date(2018, 3, 10), datetime.date(2018, 5, 1)) == 2
+    assert written == months[1:3]
+    assert parquet_store.partition_months('caiso_load') == months
@@ -0,0 +1,70 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from electricity import parquet_store, profile
+from electricity.profile import add_profiles, load_profile, profile_from_frame, view_averages
+from electricity.queries import PROFILE_KEYS, VIEWS, aggregate_query
+
+
+@pytest.fixture
+def rows():
+    rng = np.random.default_rng(2)
+    times = pd.date_range('2021-11-01', '2023-02-01', freq='h', tz='UTC', inclusive='left')
+    return pd.DataFrame({'time': times, 'load': rng.uniform(10_000, 30_000, len(times)).astype('float32')})
+
+
+@pytest.mark.parametrize('view', list(VIEWS))
+def test_view_averages_match_groupby(rows, view):
+    key = VIEWS[view]
+    per_year, overall = view_averages(profile_from_frame(rows, ['load']), view)
+
+    field = getattr(rows['time'].dt, key)
+    expected_per_year = rows['load'].astype('float64').groupby([field, rows['time'].dt.year]).mean().unstack()
+    expected_overall = rows['load'].astype('float64').groupby(field).mean()
+
+    pd.testing.assert_frame_equal(per_year['load'], expected_per_year, check_names=False, rtol=1e-5)
+    pd.testing.assert_series_equal(overall['load'], expected_overall, check_names=False, rtol=1e-5)
+
+
+def test_profiles_of_chunks_add_up(rows):
+    whole = profile_from_frame(rows, ['load'])
+    total = None
+    for chunk in np.array_split(np.arange(len(rows)), 7):
+        total = add_profiles(total, profile_from_frame(rows.iloc[chunk], ['load']))
+    pd.testing.assert_frame_equal(total.sort_index(), whole, check_dtype=False, rtol=1e-5)
+
+
+def test_buckets_are_utc_whatever_the_time_zone(rows):
+    local = rows.assign(time=rows['time'].dt.tz_convert('US/Pacific'))
+    naive = rows.assign(time=rows['time'].dt.tz_localize(None))
+    expected = profile_from_frame(rows, ['load'])
+    pd.testing.assert_frame_equal(profile_from_frame(local, ['load']), expected)
+    pd.testing.assert_frame_equal(profile_from_frame(naive, ['load']), expected)
+
+
+def test_sql_buckets_and_bounds_are_utc():
+    sql, params = aggregate_query('caiso_load', ['load'], PROFILE_KEYS, datetime.date(2024, 1, 1), None)
+    assert sql.count("AT TIME ZONE 'UTC'") == len(PROFILE_KEYS)
+    assert params == {'timemin': datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)}
+
+
+def test_long_ranges_stream_through_read_rows(rows, monkeypatch):
+    monkeypatch.setattr(profile, 'rolled_through', lambda conn, table: None)
+    monkeypatch.setattr(profile, 'value_columns', lambda conn, table: ['load'])
+    monkeypatch.setattr(parquet_store, 'has_partitions', lambda table: True)
+    monkeypatch.setattr(parquet_store, 'iter_range', None)
+    windows = []
+
+    def read_rows(table, start, end):
+        windows.append((start, end))
+        times = rows['time'].dt.date
+        return rows[(times >= start) & (times < end)]
+
+    timemin, timemax = datetime.date(2021, 11, 1), datetime.date(2023, 2, 1)
+    result = load_profile(None, 'caiso_load', timemin, timemax, read_rows=read_rows)
+
+    assert windows == [(timemin, datetime.date(2022, 11, 2)), (datetime.date(2022, 11, 2), timemax)]
+    pd.testing.assert_frame_equal(result, profile_from_frame(rows, ['load']), check_dtype=False, rtol=1e-5)
@@ -0,0 +1,89 @@
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from electricity.range_cache import RangeCache
+
+DAY = datetime.timedelta(days=1)
+START = datetime.date(2023, 1, 1)
+
+
+class Loader:
+    # 5-minute rows for any past range, recording every call
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, table, start, end):
+        self.calls.append((start, end))
+        times = pd.date_range(start, end, freq='5min', tz='UTC', inclusive='left')
+        return pd.DataFrame({'time': times, 'load': np.arange(len(times), dtype='float32')})
+
+
+def rows_between(start, end):
+    return int((end - start) / datetime.timedelta(minutes=5))
+
+
+def test_only_gaps_are_fetched():
+    loader = Loader()
+    cache = RangeCache(loader, max_bytes=1 << 30)
+    cache.get('caiso_load', START, START + 5 * DAY)
+    cache.get('caiso_load', START + 10 * DAY, START + 12 * DAY)
+    res = cache.get('caiso_load', START + 3 * DAY, START + 11 * DAY)
+
+    assert loader.calls[2:] == [(START + 5 * DAY, START + 10 * DAY)]
+    assert len(res) == rows_between(START + 3 * DAY, START + 11 * DAY)
+    assert res['time'].is_monotonic_increasing
+    assert res['time'].iloc[0] == pd.Timestamp(START + 3 * DAY, tz='UTC')
+
+
+def test_repeated_range_is_served_from_cache():
+    loader = Loader()
+    cache = RangeCache(loader, max_bytes=1 << 30)
+    first = cache.get('caiso_load', START, START + 2 * DAY)
+    second = cache.get('caiso_load', START, START + 2 * DAY)
+    assert len(loader.calls) == 1
+    pd.testing.assert_frame_equal(first.reset_index(drop=True), second.reset_index(drop=True))
+
+
+
+def test_least_recently_used_span_is_evicted():
+    loader = Loader()
+    one_day = Loader()('t', START, START + DAY).memory_usage(index=True).sum()
+    cache = RangeCache(loader, max_bytes=int(2.5 * one_day))
+    cache.get('caiso_load', START, START + DAY)
+    cache.get('caiso_load', START + 5 * DAY, START + 6 * DAY)
+    cache.get('caiso_load', START, START + DAY)
+    cache.get('caiso_load', START + 9 * DAY, START + 10 * DAY)
+    assert cache.resident_bytes() <= cache.max_bytes
+
+    calls = len(loader.calls)
+    cache.get('caiso_load', START, START + DAY)
+    assert len(loader.calls) == calls
+    cache.get('caiso_load', START + 5 * DAY, START + 6 * DAY)
+    assert loader.calls[-1] == (START + 5 * DAY, START + 6 * DAY)
+
+
+def test_empty_range_has_the_table_dtypes():
+    loader = Loader()
+    res = RangeCache(loader, max_bytes=1 << 30).get('caiso_load', START + DAY, START + DAY)
+    assert res.empty and not loader.calls
+    assert list(res.columns) == ['time', 'load']
+    assert str(res['time'].dtype).startswith('datetime64') and res['time'].dt.tz is not None
+    assert res['load'].dtype == 'float32'
+
+
+def test_tables_load_concurrently():
+    started = threading.Barrier(2, timeout=5)
+
+    def loader(table, start, end):
+        # both loads must be in flight at once to get past the barrier
+        started.wait()
+        return Loader()(table, start, end)
+
+    cache = RangeCache(loader, max_bytes=1 << 30)
+    with ThreadPoolExecutor(2) as pool:
+        results = list(pool.map(lambda table: cache.get(table, START, START + DAY), ['caiso_load', 'nyiso_load']))
+    assert [len(res) for res in results] == [288, 288]
@@ -0,0 +1,103 @@
+import datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from electricity import rollups, schemas
+from electricity.db import Database
+from electricity.eda import average_chart
+from electricity.profile import profile_from_frame, view_averages
+from electricity.queries import utc_day
+from electricity.rollups import ROLLUP_STATE_TABLE, rolled_through
+
+
+def test_rolled_through_without_state_table(tmp_path):
+    conn = Database(create_engine(f'sqlite:///{tmp_path}/iso.db'))
+    assert rolled_through(conn, 'caiso_load') is None
+
+
+def test_rolled_through_reads_state(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/iso.db')
+    with engine.begin() as db:
+        db.execute(text(f"CREATE TABLE {ROLLUP_STATE_TABLE} (table_name text PRIMARY KEY, rolled_through date NOT NULL);"))
+        db.execute(text(f"INSERT INTO {ROLLUP_STATE_TABLE} VALUES ('caiso_load', '2024-03-01');"))
+    conn = Database(engine)
+    assert rolled_through(conn, 'caiso_load') == datetime.date(2024, 3, 1)
+    assert rolled_through(conn, 'nyiso_load') is None
+
+
+def test_column_null_everywhere_stays_in_the_profile(monkeypatch):
+    # NYISO has no dual fuel feed: ingest fills the column with NULLs, so it has no rollup rows
+    sources = schemas.value_columns('nyiso_fuel_mix')
+    reported = [column for column in sources if column != 'dual_fuel']
+    rollup = pd.DataFrame([(2023, month, 0, 12, column, 100.0, 4) for month in (1, 2) for column in reported],
+                          columns=['year', 'month', 'weekday', 'hour', 'column_name', 'total', 'n'])
+
+    def read_aggregate(conn, table, keys, timemin, timemax, columns):
+        times = pd.date_range(timemin, periods=24, freq='h', tz='UTC')
+        rows = pd.DataFrame({'time': times, **{column: 1.0 for column in columns}, 'dual_fuel': float('nan')})
+        return profile_from_frame(rows, columns)
+
+    class Conn:
+        def query(self, sql, **kwargs):
+            return rollup
+
+    monkeypatch.setattr(rollups, 'rolled_through', lambda conn, table: datetime.date(2023, 3, 1))
+    monkeypatch.setattr(rollups, 'read_aggregate', read_aggregate)
+    profile = rollups.rollup_profile(Conn(), 'nyiso_fuel_mix', datetime.date(2022, 12, 15), datetime.date(2023, 3, 1))
+
+    assert list(profile['count'].columns) == sources
+    assert (profile[('count', 'dual_fuel')] == 0).all()
+    assert profile[('count', 'natural_gas')].sum() == 8 + 24
+    chart = average_chart('nyiso_fuel_mix', 'monthly', *view_averages(profile, 'monthly'))
+    assert chart.series[0]['labels'] == sources
+
+
+class RecordingConnection:
+    # SQLAlchemy connection stand-in: records statements, rolled_through answers state
+    def __init__(self, rolled_through=None):
+        self.statements = []
+        self.rolled_through = rolled_through
+
+    def execute(self, statement, params=None):
+        self.statements.append((' '.join(str(statement).split()), params))
+        return self
+
+    def scalar(self):
+        return self.rolled_through
+
+    def __iter__(self):
+        return iter([('load',)])
+
+
+def test_refresh_rollup_unpivots_every_declared_column():
+    conn = RecordingConnection()
+    rollups.refresh_rollup(conn, 'nyiso_fuel_mix')
+    insert = next(sql for sql, _ in conn.statements if sql.startswith(f'INSERT INTO {rollups.ROLLUP_TABLE} '))
+    assert all(f"('{column}', {column}::double precision)" in insert for column in schemas.value_columns('nyiso_fuel_mix'))
+    assert 'FROM nyiso_fuel_mix CROSS JOIN LATERAL' in insert
+
+
+def test_refresh_months_refolds_only_the_touched_months():
+    conn = RecordingConnection(rolled_through=datetime.date(2024, 6, 1))
+    rollups.refresh_months(conn, 'caiso_load', datetime.date(2024, 2, 10), datetime.date(2024, 3, 5))
+
+    deletes = [(sql, params) for sql, params in conn.statements if sql.startswith(f'DELETE FROM {rollups.ROLLUP_TABLE}')]
+    assert deletes[0][1] == {'table': 'caiso_load', 'first': datetime.date(2024, 2, 1), 'last': datetime.date(2024, 4, 1)}
+    # then only the months closed since the last refresh, never the whole history
+    assert all(':first' in sql or ':start' in sql for sql, _ in deletes)
+    folds = [params for sql, params in conn.statements if sql.startswith(f'INSERT INTO {rollups.ROLLUP_TABLE} ')]
+    assert (folds[0]['timemin'], folds[0]['timemax']) == (utc_day(datetime.date(2024, 2, 1)), utc_day(datetime.date(2024, 4, 1)))
+    assert folds[1]['timemin'] == utc_day(datetime.date(2024, 6, 1))
+
+
+def test_refresh_months_skips_months_not_rolled_up_yet():
+    conn = RecordingConnection(rolled_through=datetime.date(2024, 3, 1))
+    rollups.refresh_months(conn, 'caiso_load', datetime.date(2024, 4, 1), datetime.date(2024, 5, 1))
+    assert not any(':first' in sql for sql, _ in conn.statements)
+
+
+def test_refresh_rollup_rejects_unknown_tables():
+    with pytest.raises(ValueError):
+        rollups.refresh_rollup(RecordingConnection(), 'caiso_load; DROP TABLE eda_rollup')
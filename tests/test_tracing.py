@@ -0,0 +1,36 @@
+import threading
+
+from electricity.prefetch import Prefetcher
+from electricity.refresher import gather
+from electricity.tracing import run_spans, span, start_run
+
+
+def traced(stage):
+    def call():
+        with span(stage):
+            return threading.current_thread().name
+    return call
+
+
+def test_gather_spans_land_in_the_callers_run():
+    spans = start_run()
+    threads = gather({'a': traced('test.a'), 'b': traced('test.b')})
+    assert all(name.startswith('gather') for name in threads.values())
+    assert sorted(record['stage'] for record in spans) == ['test.a', 'test.b']
+    assert run_spans() is spans
+
+
+def test_prefetch_spans_land_in_the_submitting_run():
+    prefetcher = Prefetcher(max_workers=1)
+    spans = start_run()
+    prefetcher.submit('key', traced('test.prefetch'))
+    prefetcher.submitted['key'].result()
+    assert [record['stage'] for record in spans] == ['test.prefetch']
+
+    # A later run does not receive the earlier run's prefetches
+    later = start_run()
+    prefetcher.submit('other', traced('test.other'))
+    prefetcher.submitted['other'].result()
+    assert [record['stage'] for record in later] == ['test.other']
+    assert len(spans) == 1
+    prefetcher.pool.shutdown()